@@ -0,0 +1,245 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+from solana.rpc import types
+from solana.rpc.commitment import Confirmed
+from solders.account_decoder import UiAccountEncoding
+from solders.commitment_config import CommitmentLevel
+from solders.pubkey import Pubkey
+from solders.rpc.config import RpcAccountInfoConfig
+from solders.rpc.requests import AccountSubscribe, AccountUnsubscribe
+from spl.token.constants import TOKEN_PROGRAM_ID
+
+import constant
+from rpcBatcher import rpc_batcher
+from solanaWs import ws_hub
+
+TOKEN_AMOUNT_OFFSET = 64  # SPL token account layout: mint (32), owner (32), amount (u64 little endian)
+
+
+def token_amount(data: bytes):
+    return int.from_bytes(data[TOKEN_AMOUNT_OFFSET:TOKEN_AMOUNT_OFFSET + 8], "little")
+
+
+class BalanceTracker():
+    def __init__(
+        self,
+        hub=ws_hub,
+        max_wallets=constant.balanceTrackerMaxWallets,
+        idle_ttl=constant.balanceTrackerIdleTTL,
+        max_token_accounts=constant.balanceTrackerMaxTokenAccounts,
+    ):
+        """Lamports and SPL token balances of recently viewed wallets, kept current by accountSubscribe."""
+        super().__init__()
+        self.hub = hub
+        self.max_wallets = max_wallets
+        self.idle_ttl = idle_ttl
+        self.max_token_accounts = max_token_accounts
+        self.wallets = OrderedDict()  # owner -> snapshot, least recently viewed first
+        self._config = RpcAccountInfoConfig(encoding=UiAccountEncoding.Base64, commitment=CommitmentLevel.Confirmed)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _new(owner):
+        return {
+            "owner": owner,
+            "lamports": None,
+            "slot": 0,  # slot the lamports were read at
+            "tokens": {},  # token account -> {"mint", "amount", "decimals", "slot"}
+            "live_tokens": False,  # every token account is subscribed
+            "tokens_dirty": False,  # lamports moved since the token accounts were listed, one may be new
+            "handles": {},  # subscribed account -> ws_hub handle
+            "connection": None,  # ws_hub connection the snapshot was synced on
+            "viewed_at": time.monotonic(),
+            "sync": None,
+            "dropped": False,
+        }
+
+    def _is_live(self, wallet, tokens):
+        # a reconnect may have swallowed notifications, the snapshot is only trusted on the connection it was synced on
+        if wallet["connection"] != self.hub.connections or not self.hub.connected.is_set():
+            return False
+        # and only while the server acknowledged every subscription it relies on, a failed re-subscribe goes silent
+        handles = list(wallet["handles"].values()) if tokens else [wallet["handles"].get(wallet["owner"])]
+        if not all(handle is not None and self.hub.is_active(handle) for handle in handles):
+            return False
+        if tokens:
+            return wallet["live_tokens"] and not wallet["tokens_dirty"]
+        return wallet["lamports"] is not None
+
+    async def snapshot(self, owner: str, tokens=False):
+        """The wallet's snapshot, resynced over RPC first when the subscriptions cannot vouch for it."""
+        wallet = self.wallets.get(owner)
+        if wallet is None:
+            wallet = self.wallets[owner] = self._new(owner)
+        self.wallets.move_to_end(owner)
+        wallet["viewed_at"] = time.monotonic()
+        await self._evict()
+
+        if self._is_live(wallet, tokens):
+            self.hits += 1
+            if tokens and wallet["sync"] is not None and not wallet["sync"].done():
+                # a token account may just have been created or closed
+                await asyncio.shield(wallet["sync"])
+            return wallet
+        self.misses += 1
+        await asyncio.shield(self._schedule_sync(wallet))
+        return wallet
+
+    async def lamports(self, owner: str):
+        return (await self.snapshot(owner))["lamports"]
+
+    async def token_balances(self, owner: str):
+        """[{"mint", "amount", "decimals", "ui_amount"}] for every SPL token account of `owner`."""
+        wallet = await self.snapshot(owner, tokens=True)
+        return [
+            {
+                "mint": token["mint"],
+                "amount": token["amount"],
+                "decimals": token["decimals"],
+                "ui_amount": token["amount"] / 10 ** token["decimals"],
+            }
+            for token in wallet["tokens"].values()
+        ]
+
+    def _schedule_sync(self, wallet):
+        # concurrent readers and notifications share one resync
+        if wallet["sync"] is None or wallet["sync"].done():
+            wallet["sync"] = asyncio.create_task(self._sync(wallet))
+            wallet["sync"].add_done_callback(self._consume)
+        return wallet["sync"]
+
+    @staticmethod
+    def _consume(task):
+        if not task.cancelled() and task.exception() is not None:
+            print(f'Error syncing wallet balances: {task.exception()}')
+
+    async def _sync(self, wallet):
+        owner = wallet["owner"]
+        pubkey = Pubkey.from_string(owner)
+        connection = self.hub.connections if self.hub.connected.is_set() else None
+        wallet["tokens_dirty"] = False
+        # subscribe before reading, a change landing in between is then not lost
+        await self._subscribe(wallet, owner, lambda notification: self._on_wallet(owner, notification))
+        balance, accounts = await asyncio.gather(
+            rpc_batcher.get_balance(pubkey, Confirmed),
+            rpc_batcher.get_token_accounts_by_owner_json_parsed(pubkey, types.TokenAccountOpts(program_id=TOKEN_PROGRAM_ID), Confirmed),
+        )
+        if balance.context.slot >= wallet["slot"]:
+            wallet["lamports"] = balance.value
+            wallet["slot"] = balance.context.slot
+
+        slot = accounts.context.slot
+        tokens = {}
+        for account in accounts.value:
+            address = str(account.pubkey)
+            current = wallet["tokens"].get(address)
+            if current is not None and current["slot"] > slot:
+                tokens[address] = current
+                continue
+            info = account.account.data.parsed.get('info')
+            token_amount_info = info.get('tokenAmount', {})
+            tokens[address] = {
+                "mint": info.get('mint'),
+                "amount": int(token_amount_info.get('amount', 0)),
+                "decimals": token_amount_info.get('decimals', 0),
+                "slot": slot,
+            }
+        wallet["tokens"] = tokens
+
+        live_tokens = len(tokens) <= self.max_token_accounts
+        for address in [address for address in wallet["handles"] if address != owner]:
+            if not live_tokens or address not in tokens:
+                await self.hub.unsubscribe(wallet["handles"].pop(address))
+        if live_tokens:
+            await asyncio.gather(*(
+                self._subscribe(wallet, address, lambda notification, address=address: self._on_token(owner, address, notification))
+                for address in tokens
+            ))
+        wallet["live_tokens"] = live_tokens
+        wallet["connection"] = connection
+
+    async def _subscribe(self, wallet, address, callback):
+        handle = wallet["handles"].get(address)
+        if handle is not None:
+            if self.hub.is_active(handle) or not self.hub.connected.is_set():
+                # flowing, or re-sent by the hub on the next connect
+                return
+            # the re-subscribe after a reconnect failed, the server does not know this handle
+            self.hub.forget(handle)
+            del wallet["handles"][address]
+        pubkey = Pubkey.from_string(address)
+        handle = await self.hub.subscribe(
+            lambda request_id: AccountSubscribe(pubkey, self._config, request_id),
+            lambda subscription, request_id: AccountUnsubscribe(subscription, request_id),
+            callback,
+        )
+        if wallet["dropped"]:
+            # evicted while this sync was running
+            await self.hub.unsubscribe(handle)
+            return
+        wallet["handles"][address] = handle
+
+    def _on_wallet(self, owner, notification):
+        wallet = self.wallets.get(owner)
+        slot = notification.result.context.slot
+        if wallet is None or slot < wallet["slot"]:
+            return
+        wallet["lamports"] = notification.result.value.lamports
+        wallet["slot"] = slot
+        # a new token account is paid for from the wallet, but so is every trade: instead of listing the
+        # token accounts on each transaction, the next portfolio view lists them once
+        wallet["tokens_dirty"] = True
+
+    def _on_token(self, owner, address, notification):
+        wallet = self.wallets.get(owner)
+        token = wallet["tokens"].get(address) if wallet is not None else None
+        slot = notification.result.context.slot
+        if token is None or slot < token["slot"]:
+            return
+        value = notification.result.value
+        if value.lamports == 0 or len(value.data) < TOKEN_AMOUNT_OFFSET + 8:
+            # closed, the wallet notification for the returned rent drops the subscription
+            wallet["tokens"].pop(address, None)
+            return
+        token["amount"] = token_amount(value.data)
+        token["slot"] = slot
+
+    async def _evict(self):
+        now = time.monotonic()
+        while self.wallets:
+            owner, wallet = next(iter(self.wallets.items()))
+            if len(self.wallets) <= self.max_wallets and now - wallet["viewed_at"] <= self.idle_ttl:
+                break
+            del self.wallets[owner]
+            await self._drop(wallet)
+
+    async def _drop(self, wallet):
+        wallet["dropped"] = True
+        handles = list(wallet["handles"].values())
+        wallet["handles"].clear()
+        for handle in handles:
+            await self.hub.unsubscribe(handle)
+
+    async def stop(self):
+        wallets = list(self.wallets.values())
+        self.wallets.clear()
+        syncs = [wallet["sync"] for wallet in wallets if wallet["sync"] is not None]
+        for sync in syncs:
+            sync.cancel()
+        await asyncio.gather(*syncs, return_exceptions=True)
+        for wallet in wallets:
+            await self._drop(wallet)
+
+    def stats(self):
+        return {
+            "wallets": len(self.wallets),
+            "subscriptions": sum(len(wallet["handles"]) for wallet in self.wallets.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+balance_tracker = BalanceTracker()
@@ -0,0 +1,332 @@
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+
+from dotenv import load_dotenv
+from solders.pubkey import Pubkey
+from telegram import InlineKeyboardMarkup, Update
+from telegram.ext import Application, TypeHandler
+from telegram.request import BaseRequest
+
+import constant
+from solanaHelper import SolanaHelper, AsyncSolanaHelper
+from rpcRouter import close_async_clients
+from httpSession import get_http_client, close_http_client
+import messageRender
+from updateProcessor import ChatOrderedUpdateProcessor
+from webhookServer import WebhookServer
+from jupiter import JupiterHelper
+from localQuote import quote_buy, quote_buys
+from poolPrices import PoolPriceEngine, pool_prices, USDC, WSOL
+
+load_dotenv()
+
+# any funded mainnet account works, the balance itself is irrelevant
+DEFAULT_WALLET = "7NWwYNKJpE8qo4rbWuCnExHXdNMwqVhp2s2YB5973tfM"
+
+
+async def bench_handlers(users: int, wallet: str):
+    """Run `users` concurrent balance handlers, blocking I/O vs the async I/O path."""
+    pubkey = Pubkey.from_string(wallet)
+
+    sync_helper = SolanaHelper()
+
+    async def blocking_handler():
+        # what the handlers used to do: sync RPC call inside a coroutine
+        sync_helper.getBalance(pubkey)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(blocking_handler() for _ in range(users)))
+    blocking_elapsed = time.perf_counter() - start
+
+    async_helper = AsyncSolanaHelper()
+
+    async def async_handler():
+        await async_helper.getBalance(pubkey)
+
+    await async_handler()  # warm up the connection pool
+    start = time.perf_counter()
+    await asyncio.gather(*(async_handler() for _ in range(users)))
+    async_elapsed = time.perf_counter() - start
+
+    print(f"{users} concurrent users against {constant.clientURL}")
+    print(f"blocking I/O: {blocking_elapsed:.3f}s total, {blocking_elapsed / users * 1000:.1f}ms per user")
+    print(f"async I/O:    {async_elapsed:.3f}s total, {async_elapsed / users * 1000:.1f}ms per user")
+
+
+def synthetic_update(update_id: int, chat_id: int, kind: str):
+    """Telegram Update JSON shaped like what the bot receives from real users."""
+    now = int(time.time())
+    user = {"id": chat_id, "is_bot": False, "first_name": f"load{chat_id}"}
+    chat = {"id": chat_id, "type": "private", "first_name": user["first_name"]}
+    if kind == "callback":
+        return {
+            "update_id": update_id,
+            "callback_query": {
+                "id": str(update_id),
+                "from": user,
+                "chat_instance": str(chat_id),
+                "data": "wallet",
+                "message": {"message_id": update_id, "date": now, "chat": chat, "from": user, "text": "menu"},
+            },
+        }
+    text = "/main" if kind == "command" else constant.input_mint
+    message = {"message_id": update_id, "date": now, "chat": chat, "from": user, "text": text}
+    if kind == "command":
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text)}]
+    return {"update_id": update_id, "message": message}
+
+
+class OfflineRequest(BaseRequest):
+    """Answers every Bot API call locally, so handlers run without reaching Telegram."""
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, **timeouts):
+        endpoint = url.rsplit("/", 1)[-1]
+        parameters = request_data.parameters if request_data is not None else {}
+        bot_user = {"id": 1, "is_bot": True, "first_name": "offline", "username": "offline_bot"}
+        if endpoint == "getMe":
+            result = bot_user
+        elif endpoint in ("sendMessage", "editMessageText"):
+            chat_id = int(parameters.get("chat_id", 1))
+            result = {
+                "message_id": int(parameters.get("message_id", 1)),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": bot_user,
+                "text": parameters.get("text", ""),
+            }
+        else:
+            result = True
+        return 200, json.dumps({"ok": True, "result": result}).encode()
+
+
+async def bench_webhook(updates: int, concurrency: int, chats: int, port: int):
+    """POST synthetic updates to an in-process webhook bot whose Bot API calls are answered locally.
+
+    Uses the real handlers and update processor; /main and menu callbacks only talk to the Bot API,
+    so nothing leaves the machine.
+    """
+    import main as bot_main
+
+    secret = os.urandom(16).hex()
+    app = Application.builder().token("0:offline").request(OfflineRequest()).concurrent_updates(ChatOrderedUpdateProcessor()).build()
+    bot_main.Bot().add_handlers(app)
+    server = WebhookServer(app, secret, listen="127.0.0.1", port=port)
+    app.add_handler(TypeHandler(Update, server.handled), group=99)
+    url = f"http://127.0.0.1:{port}{constant.webhookPath}"
+
+    http = get_http_client()
+    headers = {"X-Telegram-Bot-Api-Secret-Token": secret}
+    kinds = ("command", "callback")
+    queue = asyncio.Queue()
+    for i in range(updates):
+        queue.put_nowait(synthetic_update(i + 1, 100000 + i % chats, kinds[i % len(kinds)]))
+
+    latencies = []
+    failures = 0
+
+    async def worker():
+        nonlocal failures
+        while not queue.empty():
+            body = queue.get_nowait()
+            start = time.perf_counter()
+            try:
+                response = await http.post(url, json=body, headers=headers)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+            except Exception as e:
+                failures += 1
+                print(f'Error posting update: {e}')
+
+    async with app:
+        await server.start()
+        await app.start()
+        try:
+            start = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            # until every accepted update has been through its handlers
+            while len(server.latencies) < len(latencies) and time.perf_counter() - start < 60:
+                await asyncio.sleep(0.01)
+            elapsed = time.perf_counter() - start
+        finally:
+            await server.stop()
+            await app.stop()
+
+    latencies.sort()
+    print(f"{updates} updates from {chats} chats, {concurrency} in flight, against an offline bot on {url}")
+    print(f"throughput: {len(server.latencies) / elapsed:.0f} updates/s handled, {failures} failed")
+    if latencies:
+        for p in (0.5, 0.95, 0.99):
+            print(f"p{int(p * 100)} ack: {latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000:.2f}ms")
+    print('handler latency', server.stats())
+
+
+SAMPLE_TOKEN = {"name": "Bonk", "symbol": "Bonk", "price_usd": "0.00002194", "liquidity_usd": 3120456.78, "fdv": 1534021844.1}
+SAMPLE_MINT = "DezXAZ8z7PnrnRJjz3wXBoRgixCa6xjnB7YaB1pPB263"
+
+
+def legacy_token_card(token_info, token_address):
+    """How send_token_info_and_swap_menu rendered before messageRender: regex per value, keyboard per call."""
+    def escape_dots(value):
+        return re.sub(r'\.', r'\\.', str(value))
+
+    message = (
+        f"Buy *{token_info['symbol']}* \\- {token_info['name']} [📈](https://dexscreener.com/solana/{token_address})\n"
+        f"`{token_address}` _\\(Tap to copy\\)_ \n\n"
+        f"Price: *${escape_dots(token_info['price_usd'])}*\n"
+        f"Liquidity: *{escape_dots(token_info['liquidity_usd'])}*\n"
+        f"FDV: *{escape_dots(token_info['fdv'])}*\n"
+    )
+    keyboard = InlineKeyboardMarkup([
+        [{"text": "----BUY ✅----", "callback_data": "toggle_buy_mode"}],
+        [{"text": "0.1 SOL", "callback_data": "buy_0.1_sol"}, {"text": "0.5 SOL", "callback_data": "buy_0.5_sol"}],
+        [{"text": "1 SOL", "callback_data": "buy_1_sol"}, {"text": "Buy with X SOL", "callback_data": "buy_x_sol"}],
+    ])
+    return message, keyboard
+
+
+def template_token_card(token_info, token_address):
+    message = messageRender.TOKEN_CARD.render(
+        symbol=token_info['symbol'],
+        name=token_info['name'],
+        chain_id="solana",
+        token_address=token_address,
+        price_usd=token_info['price_usd'],
+        liquidity_usd=token_info['liquidity_usd'],
+        fdv=token_info['fdv'],
+    )
+    return message, messageRender.SWAP_MENU
+
+
+def bench_render(iterations: int):
+    """Token cards rendered per second, per-call regex and keyboard vs compiled template and prebuilt keyboard."""
+    for name, render in (("legacy", legacy_token_card), ("template", template_token_card)):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            render(SAMPLE_TOKEN, SAMPLE_MINT)
+        elapsed = time.perf_counter() - start
+        print(f"{name:9} {iterations / elapsed:>10.0f} cards/s, {elapsed / iterations * 1e6:.2f}us per card")
+
+
+def synthetic_engine():
+    """A PoolPriceEngine holding one Raydium-like TOKEN/SOL pool, no network involved."""
+    engine = PoolPriceEngine()
+    engine.pools[SAMPLE_MINT] = {
+        "kind": "raydium",
+        "mint": SAMPLE_MINT,
+        "base_mint": SAMPLE_MINT,
+        "quote_mint": WSOL,
+        "base_decimals": 5,
+        "quote_decimals": 9,
+        "base_reserve": 12_000_000_000 * 10 ** 5,
+        "quote_reserve": 1_800 * 10 ** 9,
+        "fee_bps": 25,
+    }
+    return engine
+
+
+POOL_FIXTURE_FIELDS = ("kind", "base_mint", "quote_mint", "base_decimals", "quote_decimals", "base_reserve", "quote_reserve", "fee_bps")
+
+
+def record_quote(path: str, mint: str, amount, remote):
+    """Append the pools in memory and jupiter's outAmount to the quote fixtures, for single-route answers only."""
+    if len(remote.get("routePlan", [])) != 1:
+        print(f"{amount} SOL: jupiter split the route, not recorded")
+        return
+    pool = pool_prices.pools[mint]
+    pools = {mint: {field: pool[field] for field in POOL_FIXTURE_FIELDS}}
+    if USDC in (pool["base_mint"], pool["quote_mint"]):
+        sol_pool = pool_prices.pools[WSOL]
+        pools[WSOL] = {field: sol_pool[field] for field in POOL_FIXTURE_FIELDS}
+    fixtures = {"_comment": "Single-route Jupiter quotes and the pool reserves in memory when they were taken.", "cases": []}
+    if os.path.exists(path):
+        with open(path) as f:
+            fixtures = json.load(f)
+    fixtures["cases"].append({
+        "name": f"jupiter {pool['kind']} {mint[:8]} {amount} SOL",
+        "mint": mint,
+        "sol_amount": amount,
+        "slippage_bps": constant.swapSlippageBps,
+        "pools": pools,
+        "out_amount": remote["outAmount"],
+    })
+    with open(path, "w") as f:
+        json.dump(fixtures, f, indent=2)
+
+
+async def bench_quote(iterations: int, mint: str, record: str = ""):
+    """Local buy previews per second; with --mint, local quotes next to live Jupiter quotes for the same buys."""
+    engine = synthetic_engine()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        quote_buys(SAMPLE_MINT, constant.buyAmounts, constant.swapSlippageBps, engine)
+    elapsed = time.perf_counter() - start
+    print(f"local     {iterations / elapsed:>10.0f} cards/s, {elapsed / iterations * 1e6:.2f}us per {len(constant.buyAmounts)} quotes")
+
+    if not mint:
+        return
+    await pool_prices.track([mint, WSOL])
+    jupiter = JupiterHelper()
+    for amount in constant.buyAmounts:
+        local = quote_buy(mint, amount)
+        if local is None:
+            print(f"{amount} SOL: no decodable pool for {mint}")
+            continue
+        start = time.perf_counter()
+        remote = await jupiter.quote(mint, int(amount * 1000000000), constant.swapSlippageBps)
+        elapsed = time.perf_counter() - start
+        deviation = local["out_raw"] / int(remote["outAmount"]) - 1
+        print(f"{amount} SOL: local {local['out_raw']} jupiter {remote['outAmount']} ({deviation:+.3%}), jupiter took {elapsed * 1000:.0f}ms")
+        if record:
+            record_quote(record, mint, amount, remote)
+    await pool_prices.stop()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="bot latency benchmarks")
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    handlers = sub.add_parser("handlers", help="concurrent users, blocking vs async I/O")
+    handlers.add_argument("--users", type=int, default=20)
+    handlers.add_argument("--wallet", default=DEFAULT_WALLET)
+
+    webhook = sub.add_parser("webhook", help="synthetic updates through an in-process webhook bot with an offline Bot API")
+    webhook.add_argument("--port", type=int, default=constant.webhookPort)
+    webhook.add_argument("--updates", type=int, default=1000)
+    webhook.add_argument("--concurrency", type=int, default=50)
+    webhook.add_argument("--chats", type=int, default=100)
+
+    render = sub.add_parser("render", help="token card rendering throughput")
+    render.add_argument("--iterations", type=int, default=100000)
+
+    quote = sub.add_parser("quote", help="local constant-product buy previews, optionally checked against jupiter")
+    quote.add_argument("--iterations", type=int, default=100000)
+    quote.add_argument("--mint", default="", help="compare local quotes for this mint with live jupiter quotes")
+    quote.add_argument("--record", default="", help="append those jupiter quotes to this fixture file (tests/fixtures/aggregator_quotes.json, created if missing)")
+
+    args = parser.parse_args()
+    try:
+        if args.bench == "handlers":
+            await bench_handlers(args.users, args.wallet)
+        elif args.bench == "render":
+            bench_render(args.iterations)
+        elif args.bench == "quote":
+            await bench_quote(args.iterations, args.mint, args.record)
+        elif args.bench == "webhook":
+            await bench_webhook(args.updates, args.concurrency, args.chats, args.port)
+    finally:
+        await close_http_client()
+        await close_async_clients()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
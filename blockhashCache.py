@@ -0,0 +1,77 @@
+import asyncio
+import time
+
+import constant
+from rpcRouter import rpc_router
+
+
+class BlockhashCache():
+    def __init__(
+        self,
+        router=rpc_router,
+        refresh_interval=constant.blockhashRefreshInterval,
+        max_age=constant.blockhashMaxAge,
+        commitment=constant.blockhashCommitment,
+    ):
+        """Latest blockhash and its last_valid_block_height, refreshed in the background for every signer."""
+        super().__init__()
+        self.router = router
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self.commitment = commitment
+        self.value = None  # solders RpcBlockhash: .blockhash, .last_valid_block_height
+        self.fetched_at = 0.0
+        self._inflight = None
+        self._refresher = None
+
+    def latest(self):
+        """Cached blockhash or None when there is nothing fresh enough; never touches the network."""
+        if self.value is None or time.monotonic() - self.fetched_at > self.max_age:
+            return None
+        return self.value
+
+    async def _fetch(self):
+        response = await self.router.call("get_latest_blockhash", self.commitment)
+        self.value = response.value
+        self.fetched_at = time.monotonic()
+        return self.value
+
+    async def refresh(self):
+        if self._inflight is None:
+            self._inflight = asyncio.create_task(self._fetch())
+        task = self._inflight
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if self._inflight is task and task.done():
+                self._inflight = None
+
+    async def get(self):
+        # only waits on RPC when the background refresher is not running or has been failing
+        return self.latest() or await self.refresh()
+
+    def start(self):
+        if self._refresher is None or self._refresher.done():
+            self._refresher = asyncio.create_task(self._run_refresher())
+
+    async def _run_refresher(self):
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f'Error refreshing blockhash: {e}')
+            await asyncio.sleep(self.refresh_interval)
+
+    async def stop(self):
+        if self._refresher is not None:
+            self._refresher.cancel()
+            try:
+                await self._refresher
+            except asyncio.CancelledError:
+                pass
+            self._refresher = None
+
+
+blockhash_cache = BlockhashCache()
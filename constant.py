@@ -1,6 +1,120 @@
 
 clientURL = "https://api.mainnet-beta.solana.com"
 # clientURL = "https://api.devnet.solana.com"
+wsURL = "wss://api.mainnet-beta.solana.com"
 
 solanaTrackerURL = "https://rpc.solanatracker.io/public?advancedTx=true"
-input_mint = "So11111111111111111111111111111111111111112"
\ No newline at end of file
+
+# every RPC call goes through rpcRouter, which picks the healthiest of these
+rpcEndpoints = [
+    {"url": clientURL, "weight": 1},
+    {"url": solanaTrackerURL, "weight": 1},
+]
+input_mint = "So11111111111111111111111111111111111111112"
+
+raydiumPriceURL = "https://api.raydium.io/v2/main/price"
+priceCacheTTL = 30  # seconds a downloaded price map is served before refetching
+priceRefreshInterval = 15  # seconds between background refreshes
+
+dexscreenerTokensURL = "https://api.dexscreener.io/latest/dex/tokens/"
+dexscreenerBatchSize = 30  # max comma separated addresses dexscreener accepts per request
+tokenMarketTTL = 20  # seconds price/liquidity/fdv are served from memory
+
+httpMaxConnections = 100
+httpMaxKeepaliveConnections = 20
+httpTimeout = 10  # seconds
+
+rpcPoolSize = 50  # keep-alive connections per RPC endpoint
+rpcTimeout = 10  # seconds
+rpcConnectTimeout = 5  # seconds
+rpcKeepaliveExpiry = 120  # seconds an idle RPC connection is kept open
+
+rpcEwmaAlpha = 0.2  # weight of the newest sample in the latency/error averages
+rpcEjectErrorRate = 0.5  # error rate above which an endpoint stops receiving calls
+rpcEjectSeconds = 30  # minimum time an ejected endpoint sits out before re-probing
+rpcProbeInterval = 10  # seconds between background health probes
+
+rpcBatchWindow = 0.005  # seconds calls are collected before being sent as one JSON-RPC batch
+rpcMaxBatchSize = 100  # requests per batch array
+rpcMaxSignaturesPerCall = 256  # getSignatureStatuses limit
+
+wsPingInterval = 20  # seconds between websocket keep-alive pings
+wsReconnectDelay = 1  # seconds before the first reconnect attempt, doubled up to wsMaxReconnectDelay
+wsMaxReconnectDelay = 30
+confirmationSafetyPollInterval = 2  # seconds between status polls while the websocket is healthy
+
+rebroadcastInterval = 2  # seconds between resends of a pending transfer
+rebroadcastFanOut = 2  # endpoints each (re)send goes to in parallel, 1 sends to the best node only
+
+blockhashRefreshInterval = 0.4  # seconds between background getLatestBlockhash calls
+blockhashMaxAge = 20  # seconds a cached blockhash is still handed out if refreshing fails
+blockhashCommitment = "confirmed"
+
+userCacheSize = 10000  # UserModel records kept in memory, least recently used evicted first
+
+userBatchSize = 500  # wallet documents fetched per page when streaming users
+
+writeBatchSize = 500  # queued writes that trigger an immediate bulk_write
+writeFlushInterval = 1.0  # seconds between write-behind flushes
+writeSpoolPath = "write_spool.ndjson"  # failed writes are kept here and replayed on the next start
+
+botMode = "polling"  # "polling" or "webhook", the BOT_MODE env var overrides it
+pollTimeout = 30  # seconds telegram holds a getUpdates long poll open
+webhookListen = "0.0.0.0"
+webhookPort = 8443
+webhookPath = "/telegram"  # WEBHOOK_URL must point at this path, WEBHOOK_SECRET is checked on every POST
+webhookMaxConnections = 100  # parallel connections telegram opens to the webhook
+webhookLatencySamples = 10000  # end-to-end latencies kept for the shutdown stats
+
+updateConcurrency = 256  # updates whose handlers run at the same time, across different chats
+updateMaxPending = 4096  # updates accepted at once, including those waiting behind their own chat
+
+tradeDedupeWindow = 2  # seconds after a trade finishes during which the same tap is ignored, only long enough for double taps and redelivered callbacks
+
+swapSlippageBps = 100  # 1% slippage in basis points
+buyAmounts = [0.1, 0.5, 1]  # SOL amounts of the token card buy buttons
+quotePrefetchTTL = 10  # seconds a prefetched swap quote is still used for a tap
+quotePrefetchSize = 3000  # prefetched quotes kept, oldest dropped first
+
+jupiterQuoteURL = "https://quote-api.jup.ag/v6/quote"
+jupiterSwapURL = "https://quote-api.jup.ag/v6/swap"
+swapQuoteBudget = 0.6  # seconds the router waits for every backend's quote before taking the best one in hand
+swapQuoteTimeout = 8  # seconds after which a backend's quote counts as failed
+swapLatencySamples = 1000  # quote latencies kept per backend for the shutdown stats
+
+priorityFeeRefreshInterval = 5  # seconds between getRecentPrioritizationFees samples
+priorityFeeWindows = [20, 50, 150]  # newest slots each percentile table covers, the RPC keeps 150
+# preset -> (slot window, percentile of the per-slot fees)
+priorityFeePresets = {
+    "economy": (150, 25),
+    "fast": (50, 60),
+    "turbo": (20, 90),
+}
+priorityFeePreset = "fast"  # what swaps use
+priorityFeeComputeUnits = 200000  # compute units a swap is assumed to request when turning a price into a SOL fee
+priorityFeeMinMicroLamports = 1000
+priorityFeeMaxSol = 0.005  # never pay more than this per transaction
+priorityFeeDefaultSol = 0.00005  # used until the first sample arrives
+priorityFeeMaxWatched = 32  # mints whose swap accounts are sampled separately, least recently traded dropped
+priorityFeeWatchTTL = 600  # seconds a mint's swap accounts keep being sampled after its last trade
+priorityFeeMaxAccounts = 128  # getRecentPrioritizationFees limit
+
+cuProfileMargin = 0.15  # headroom over the simulated compute units
+cuProfileTTL = 600  # seconds before a route is simulated again, a large change is logged as drift
+cuProfileDrift = 0.2  # relative change between simulations reported as drift
+cuProfileMaxEntries = 1000  # routes profiled, least recently used dropped
+cuMaxLimit = 1400000  # most compute a transaction may request
+
+balanceTrackerMaxWallets = 500  # wallets kept subscribed, the least recently viewed is unsubscribed first
+balanceTrackerIdleTTL = 1800  # seconds without a balance view after which a wallet is unsubscribed
+balanceTrackerMaxTokenAccounts = 50  # wallets holding more token accounts read them over RPC instead
+
+usdcMint = "EPjFWDhRHmnZNddt6Fo7mAtpckpXEC3sQT6VvcCtAC6K"
+solUsdcPool = "58oQChx4yWmvKdwLLZzBi4ChoCc2fqCUWBkwMihLYQo2"  # Raydium SOL/USDC pool the SOL price is read from
+raydiumAmmProgram = "675kPX9MHTjS2zt1qfr1NYHuzeLXfQM9H24wFSUt1Mp8"
+pumpFunProgram = "6EF8rrecthR5Dkzon8Nwu78hRvfCKubJ14M5uBEwF6P"
+pumpFunFeeBps = 100  # bonding curve trade fee
+poolPriceMaxPools = 1000  # pools kept subscribed, least recently priced unsubscribed first
+poolDiscoveryRetry = 300  # seconds before looking again for a pool of a mint that had none we can decode
+poolDiscoveryCandidates = 3  # most liquid dexscreener pairs checked on chain per mint
+buyPreviewWait = 0.3  # seconds the token card waits for a first pool lookup before showing without buy previews
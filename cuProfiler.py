@@ -0,0 +1,145 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict
+
+from solders.compute_budget import ID as COMPUTE_BUDGET_ID, set_compute_unit_limit
+from solders.instruction import AccountMeta, CompiledInstruction, Instruction
+from solders.commitment_config import CommitmentLevel
+from solders.message import Message
+from solders.rpc.config import RpcSimulateTransactionConfig
+from solders.rpc.requests import SimulateLegacyTransaction, SimulateVersionedTransaction
+from solders.rpc.responses import SimulateTransactionResp
+from solders.transaction import Transaction
+
+import constant
+from rpcRouter import rpc_router
+
+SET_COMPUTE_UNIT_LIMIT = 2  # ComputeBudget instruction discriminator
+COMPUTE_BUDGET_UNITS = 150  # what an added ComputeBudget instruction itself consumes
+
+
+def route_key(message, mint=None):
+    """(programs the transaction invokes, token) - transactions sharing it burn about the same compute."""
+    keys = message.account_keys
+    programs = {keys[ix.program_id_index] for ix in message.instructions}
+    programs.discard(COMPUTE_BUDGET_ID)
+    return (tuple(sorted(str(program) for program in programs)), mint)
+
+
+def with_compute_unit_limit(transaction: Transaction, units: int) -> Transaction:
+    """An unsigned copy of a legacy transaction requesting `units`; transactions needing other signers are returned as is."""
+    message = transaction.message
+    header = message.header
+    if header.num_required_signatures != 1:
+        return transaction
+    keys = message.account_keys
+    limit_ix = set_compute_unit_limit(units)
+
+    instructions = list(message.instructions)
+    for i, ix in enumerate(instructions):
+        if keys[ix.program_id_index] == COMPUTE_BUDGET_ID and bytes(ix.data)[:1] == bytes([SET_COMPUTE_UNIT_LIMIT]):
+            # same accounts and program, only the requested units change
+            instructions[i] = CompiledInstruction(ix.program_id_index, limit_ix.data, bytes(ix.accounts))
+            updated = Message.new_with_compiled_instructions(
+                header.num_required_signatures,
+                header.num_readonly_signed_accounts,
+                header.num_readonly_unsigned_accounts,
+                keys,
+                message.recent_blockhash,
+                instructions,
+            )
+            return Transaction.new_unsigned(updated)
+
+    decompiled = [
+        Instruction(
+            keys[ix.program_id_index],
+            bytes(ix.data),
+            [AccountMeta(keys[a], message.is_signer(a), message.is_writable(a)) for a in bytes(ix.accounts)],
+        )
+        for ix in instructions
+    ]
+    # the profile was simulated without this instruction, cover its own cost
+    limit_ix = set_compute_unit_limit(units + COMPUTE_BUDGET_UNITS)
+    updated = Message.new_with_blockhash([limit_ix] + decompiled, keys[0], message.recent_blockhash)
+    return Transaction.new_unsigned(updated)
+
+
+class ComputeUnitProfiler():
+    def __init__(
+        self,
+        margin=constant.cuProfileMargin,
+        ttl=constant.cuProfileTTL,
+        drift=constant.cuProfileDrift,
+        max_profiles=constant.cuProfileMaxEntries,
+    ):
+        """Compute units consumed per route, measured by simulating one representative transaction."""
+        super().__init__()
+        self.margin = margin
+        self.ttl = ttl
+        self.drift = drift
+        self.max_profiles = max_profiles
+        self.profiles = OrderedDict()  # route key -> {"units", "limit", "simulated_at"}
+        self._inflight = {}  # route key -> simulation task
+
+    def limit(self, key):
+        """Compute-unit limit to request for `key`, None until it has been profiled."""
+        profile = self.profiles.get(key)
+        if profile is None:
+            return None
+        self.profiles.move_to_end(key)
+        return profile["limit"]
+
+    def observe(self, key, transaction):
+        """Profile `key` from `transaction` in the background when it has no fresh profile yet."""
+        profile = self.profiles.get(key)
+        if profile is not None and time.monotonic() - profile["simulated_at"] <= self.ttl:
+            return
+        if key in self._inflight:
+            return
+        self._inflight[key] = asyncio.create_task(self._profile(key, transaction))
+
+    async def simulate(self, transaction):
+        config = RpcSimulateTransactionConfig(sig_verify=False, replace_recent_blockhash=True, commitment=CommitmentLevel.Confirmed)
+        if isinstance(transaction, Transaction):
+            body = SimulateLegacyTransaction(transaction, config)
+        else:
+            body = SimulateVersionedTransaction(transaction, config)
+        response = await rpc_router.run(
+            lambda client: client._provider.make_request(body, SimulateTransactionResp), "simulateTransaction"
+        )
+        if response.value.err is not None:
+            raise Exception(f'simulation failed: {response.value.err}')
+        return response.value.units_consumed
+
+    async def _profile(self, key, transaction):
+        try:
+            units = await self.simulate(transaction)
+            previous = self.profiles.get(key)
+            if previous is not None and abs(units - previous["units"]) > previous["units"] * self.drift:
+                print(f'compute units of {key} drifted from {previous["units"]} to {units}')
+            self.profiles[key] = {
+                "units": units,
+                "limit": min(math.ceil(units * (1 + self.margin)), constant.cuMaxLimit),
+                "simulated_at": time.monotonic(),
+            }
+            self.profiles.move_to_end(key)
+            while len(self.profiles) > self.max_profiles:
+                self.profiles.popitem(last=False)
+        except Exception as e:
+            print(f'Error profiling compute units: {e}')
+        finally:
+            del self._inflight[key]
+
+    def invalidate(self, key):
+        """Forget a profile whose limit turned out too low, the next transaction re-profiles it."""
+        self.profiles.pop(key, None)
+
+    async def stop(self):
+        tasks = list(self._inflight.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+cu_profiler = ComputeUnitProfiler()
@@ -0,0 +1,31 @@
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+# fields UserModel needs, everything else (_id, legacy keys) stays on the server
+USER_PROJECTION = {"_id": 0, "userId": 1, "privateKey": 1, "publicKey": 1, "keypair": 1}
+
+INDEXES = {
+    "wallet": [
+        ([("userId", ASCENDING)], {"name": "userId_unique", "unique": True}),
+        ([("publicKey", ASCENDING)], {"name": "publicKey"}),
+    ],
+    "token_metadata": [
+        ([("mint", ASCENDING)], {"name": "mint_unique", "unique": True}),
+    ],
+    "trades": [
+        ([("userId", ASCENDING), ("createdAt", DESCENDING)], {"name": "userId_createdAt"}),
+        ([("signature", ASCENDING)], {"name": "signature_unique", "unique": True, "sparse": True}),
+    ],
+}
+
+
+async def ensure_indexes(db):
+    """Create every index the bot relies on. Safe to run on each start, existing indexes are left alone."""
+    for collection_name, indexes in INDEXES.items():
+        collection = db[collection_name]
+        for keys, options in indexes:
+            try:
+                await collection.create_index(keys, **options)
+            except OperationFailure as e:
+                # typically duplicate userIds created before the unique index existed
+                print(f'Error creating index {collection_name}.{options["name"]}: {e}')
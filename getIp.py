@@ -1,3 +1,6 @@
+import constant
+from dbSchema import USER_PROJECTION
+
 
     
 def get_public_ip():
@@ -26,15 +29,12 @@ def setIpAddressInMongo():
         wallet_collection = db['wallets']
         print('-wallet',wallet_collection)
         
-        all_users = []
         try:
-            for user_dict in wallet_collection.find():
-                all_users.append(UserModel(**user_dict))
+            # stream instead of collecting every wallet into a list first
+            for user_dict in wallet_collection.find({}, USER_PROJECTION).batch_size(constant.userBatchSize):
+                print('u',UserModel(**user_dict))
         except Exception as e:
             print(f'Error getting all users: {e}')
-        
-        for user in all_users:
-            print('u',user)
             
     else:
         print(
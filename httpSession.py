@@ -0,0 +1,26 @@
+import httpx
+
+import constant
+
+_http_client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    # one pooled keep-alive client for every outgoing REST call of the process
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=constant.httpTimeout,
+            limits=httpx.Limits(
+                max_connections=constant.httpMaxConnections,
+                max_keepalive_connections=constant.httpMaxKeepaliveConnections,
+            ),
+        )
+    return _http_client
+
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
@@ -13,6 +13,10 @@ from solders.signature import Signature
 from solana.rpc.types import TxOpts
 from solana.rpc.async_api import AsyncClient
 from solana.rpc.commitment import Processed
+from rpcRouter import rpc_router
+from txConfirmation import confirmation_engine
+from httpSession import get_http_client
+from priorityFee import priority_fees, GLOBAL
 
 from jupiter_python_sdk.jupiter import Jupiter, Jupiter_DCA
 import httpx
@@ -124,7 +128,7 @@ class JupiterHelper():
         # self._provider = http.HTTPProvider(endpoint, timeout=timeout, extra_headers=extra_headers)
         self.solana_rpc_url = constant.clientURL
 
-        self.async_client = AsyncClient(self.solana_rpc_url)
+        self.async_client = rpc_router.client
         
 
     def initializeJup(self, keypair):
@@ -141,16 +145,49 @@ class JupiterHelper():
         )
         return self.jupiter
     
+    async def quote(self, output_mint: str, amount: int, slippage_bps: int):
+        # the sdk's quote/swap use blocking httpx calls, these go through the shared async client
+        params = {
+            "inputMint": constant.input_mint,
+            "outputMint": str(output_mint),
+            "amount": str(amount),
+            "slippageBps": str(slippage_bps),
+            "swapMode": "ExactIn",
+        }
+        response = await get_http_client().get(constant.jupiterQuoteURL, params=params)
+        quote = response.json()
+        if 'routePlan' not in quote:
+            raise Exception(quote.get('error', quote))
+        return quote
+
+    async def swap_transaction(self, quote: dict, payer: str):
+        transaction_parameters = {
+            "quoteResponse": quote,
+            "userPublicKey": payer,
+            "wrapAndUnwrapSol": True,
+            # jupiter simulates the swap and sizes the compute-unit limit itself
+            "dynamicComputeUnitLimit": True,
+        }
+        price = priority_fees.micro_lamports(constant.priorityFeePreset, key=quote.get("outputMint", GLOBAL))
+        if price is not None:
+            transaction_parameters["computeUnitPriceMicroLamports"] = price
+        response = await get_http_client().post(constant.jupiterSwapURL, json=transaction_parameters)
+        swap = response.json()
+        if 'swapTransaction' not in swap:
+            raise Exception(swap.get('error', swap))
+        return swap
+
+    def sign_swap(self, transaction_data: str, sender: Keypair) -> bytes:
+        raw_transaction = VersionedTransaction.from_bytes(base64.b64decode(transaction_data))
+        signature = sender.sign_message(message.to_bytes_versioned(raw_transaction.message))
+        return bytes(VersionedTransaction.populate(raw_transaction.message, [signature]))
+
     async def execute_swap(self, output_mint: str, amount: int, slippage_bps: int, sender: Keypair):
         max_retries = 3
         for attempt in range(max_retries):
             try:
-                transaction_data = await self.jupiter.swap(
-                    input_mint=constant.input_mint,
-                    output_mint=str(output_mint),
-                    amount=amount,
-                    slippage_bps=slippage_bps,
-                )
+                quote = await self.quote(output_mint, amount, slippage_bps)
+                transaction_data = (await self.swap_transaction(quote, str(sender.pubkey())))['swapTransaction']
                 break
             except httpx.ReadTimeout as e:
                 if attempt < max_retries - 1:
@@ -167,11 +204,9 @@ class JupiterHelper():
                 return ""
 
         try:
-            raw_transaction = VersionedTransaction.from_bytes(base64.b64decode(transaction_data))
-            signature = sender.sign_message(message.to_bytes_versioned(raw_transaction.message))
-            signed_txn = VersionedTransaction.populate(raw_transaction.message, [signature])
+            signed_txn = self.sign_swap(transaction_data, sender)
             opts = TxOpts(skip_preflight=False, preflight_commitment=Processed)
-            result = await self.async_client.send_raw_transaction(txn=bytes(signed_txn), opts=opts)
+            result = await self.async_client.send_raw_transaction(txn=signed_txn, opts=opts)
             transaction_id = json.loads(result.to_json())['result']
             print(f"Transaction sent: https://solscan.io/tx/{transaction_id}")
             return transaction_id
@@ -180,19 +215,14 @@ class JupiterHelper():
             return ""
 
     async def check_transaction_status(self, transaction_id: str):
-        max_checks = 5
-        for attempt in range(max_checks):
-            try:
-                response = await self.async_client.get_signature_statuses([Signature.from_string(transaction_id)])
-                status = response.value[0]
-                if status is not None:
-                    print(f"Transaction status: {status}")
-                    break
-                else:
-                    print(f"Transaction status not found, retrying {attempt + 1}/{max_checks}...")
-                    await asyncio.sleep(5)  # Wait before retrying
-            except Exception as e:
-                print(f"Error checking transaction status: {e}")
+        max_wait = 25  # seconds, what the old 5 x 5s polling allowed
+        try:
+            err = await confirmation_engine.confirm(Signature.from_string(transaction_id), commitment="processed", timeout=max_wait)
+            print(f"Transaction status: {'failed ' + str(err) if err else 'processed'}")
+        except asyncio.TimeoutError:
+            print(f"Transaction status not found after {max_wait}s")
+        except Exception as e:
+            print(f"Error checking transaction status: {e}")
 
 
 # helper = JupiterHelper()
@@ -0,0 +1,62 @@
+import constant
+from poolPrices import WSOL, USDC, pool_prices
+
+LAMPORTS_PER_SOL = 1000000000
+
+
+def swap_out(pool, mint_in, amount_in: int):
+    """Constant-product output (raw units) and price impact of swapping `amount_in` raw units of `mint_in` through `pool`."""
+    if mint_in == pool["base_mint"]:
+        reserve_in, reserve_out = pool["base_reserve"], pool["quote_reserve"]
+    else:
+        reserve_in, reserve_out = pool["quote_reserve"], pool["base_reserve"]
+    if not reserve_in or not reserve_out or amount_in <= 0:
+        return None
+    if pool["kind"] == "pumpfun":
+        # the curve charges its fee on top of the SOL spent
+        net = amount_in * 10000 // (10000 + int(pool["fee_bps"]))
+    else:
+        net = int(amount_in * (10000 - pool["fee_bps"]) // 10000)
+    out = reserve_out * net // (reserve_in + net)
+    return out, net / (reserve_in + net)
+
+
+def quote_buy(mint, sol_amount, slippage_bps=constant.swapSlippageBps, engine=pool_prices):
+    """Expected tokens, price impact and minimum received for a buy of `sol_amount` SOL, from the reserves in memory.
+
+    None when the mint has no tracked pool yet.
+    """
+    pool = engine.pools.get(mint)
+    if pool is None:
+        return None
+    counter = pool["quote_mint"] if pool["base_mint"] == mint else pool["base_mint"]
+    amount = int(sol_amount * LAMPORTS_PER_SOL)
+    kept = 1.0  # share of the mid price left after every hop's impact
+    if counter == USDC:
+        # SOL -> USDC on the SOL/USDC pool first
+        sol_pool = engine.pools.get(WSOL)
+        hop = swap_out(sol_pool, WSOL, amount) if sol_pool is not None else None
+        if hop is None:
+            return None
+        amount, impact = hop
+        kept *= 1 - impact
+    elif counter != WSOL:
+        return None
+    hop = swap_out(pool, counter, amount)
+    if hop is None:
+        return None
+    out, impact = hop
+    kept *= 1 - impact
+    decimals = pool["base_decimals"] if pool["base_mint"] == mint else pool["quote_decimals"]
+    return {
+        "sol_amount": sol_amount,
+        "out_raw": out,
+        "out_amount": out / 10 ** decimals,
+        "price_impact": 1 - kept,
+        "min_received": out * (10000 - slippage_bps) // 10000 / 10 ** decimals,
+    }
+
+
+def quote_buys(mint, amounts=constant.buyAmounts, slippage_bps=constant.swapSlippageBps, engine=pool_prices):
+    quotes = [quote_buy(mint, amount, slippage_bps, engine) for amount in amounts]
+    return [quote for quote in quotes if quote is not None]
@@ -1,21 +1,25 @@
 import asyncio
 import os
+import signal
 import re
 import requests
+import httpx
 import base64
 import json
 import math  
 import locale
+import datetime
 
 from requests.auth import HTTPDigestAuth
 from typing import Final
 from dotenv import load_dotenv
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import Application, CommandHandler, CallbackQueryHandler, MessageHandler, filters, ContextTypes
+from telegram import Update
+from telegram.ext import Application, CommandHandler, CallbackQueryHandler, MessageHandler, TypeHandler, filters, ContextTypes
 from telegram.constants import ParseMode
 
 from solders.keypair import Keypair
 from solders.pubkey import Pubkey
+from solders.signature import Signature
 from solana.rpc.api import Client
 from solders.hash import Hash
 from solana.transaction import Transaction
@@ -24,65 +28,57 @@ from solders.system_program import TransferParams, transfer
 from pydantic import BaseModel, Field, field_validator # v2 needed
 from bson import ObjectId
 from typing import Optional, List
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
 
 # custom module
-from solanaHelper import SolanaHelper
+from solanaHelper import AsyncSolanaHelper
+from rpcRouter import rpc_router, close_async_clients
+from solanaWs import ws_hub
+from txConfirmation import confirmation_engine
+from txRebroadcast import rebroadcaster
+from blockhashCache import blockhash_cache
+from priorityFee import priority_fees
+from cuProfiler import cu_profiler
 from jupiter import JupiterHelper
 from decimal import Decimal
 from swap.solanaSwap import SolanaSwapModule
+from swapRouter import SwapRouter
+from priceCache import price_cache
+from httpSession import close_http_client
+from tokenMetadata import TokenMetadataStore
+from userCache import user_cache
+from dbSchema import ensure_indexes, USER_PROJECTION
+from userStore import iter_users
+from writeBehind import WriteBehindQueue
+from messageRender import escape_md, MAIN_MENU, WALLET_MENU, SWAP_MENU, TOKEN_CARD, BUY_PREVIEW_ROW, WALLET_BALANCE, POSITIONS_HEADER, POSITIONS_BALANCE, POSITIONS_TOTAL, POSITION_ROW, POSITION_VALUE_ROW
+from webhookServer import WebhookServer
+from updateProcessor import ChatOrderedUpdateProcessor
+from tradeQueue import trade_queue
+from quotePrefetch import quote_prefetcher
+from balanceTracker import balance_tracker
+from poolPrices import pool_prices
+from localQuote import quote_buys
 import constant
 
 load_dotenv()
 
 dbURI = os.getenv("dbURI")
 TOKEN = os.getenv("TOKEN")
+BOT_MODE = os.getenv("BOT_MODE", constant.botMode)
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
 # SHYFT_API_KEY = os.getenv("SHYFT_API_KEY")
-mongoClient = MongoClient(dbURI)
+mongoClient = AsyncIOMotorClient(dbURI)
 db = mongoClient.telegram 
 wallet_collection = db.wallet 
+token_metadata = TokenMetadataStore(db.token_metadata)
+write_behind = WriteBehindQueue(db)
 
 BOT_NAME: Final = '@crypto737263_bot'
 chain_id = "solana"  # Change to the appropriate chain ID
 locale.setlocale(locale.LC_ALL, 'en_US.UTF-8') 
 
 
-main_keyboard = [
-    [
-        {"text": "Buy Tokens", "callback_data": "buy_token"},
-        {"text": "Positions", "callback_data": "positions"}
-    ],
-    [
-        {"text": "Wallet", "callback_data": "wallet"},
-        {"text": "Settings", "callback_data": "settings"},
-    ],
-    [
-        {"text": "Transfer Token", "callback_data": "transfer_token"},
-    ],
-    [
-        {"text": "List tokens", "callback_data": "list_token"},
-    ],
-]
-
-submenu_keyboard = [
-    [
-        InlineKeyboardButton("Generate Wallet", callback_data='generate_wallet'),
-    ],
-    [
-        InlineKeyboardButton("Export Private Key", callback_data='export_private_key'),
-        InlineKeyboardButton("Check Balance", callback_data='get_balance'),
-    ],
-    [
-        InlineKeyboardButton("Withdraw SOL", callback_data='withdraw_sol'),
-        InlineKeyboardButton("Send SOL", callback_data='send_sol'),
-    ],
-    [
-        InlineKeyboardButton("Back", callback_data='back_to_main'),
-    ]
-]
-
-
-
 class Bot():
     def __init__(
         self,
@@ -91,46 +87,120 @@ class Bot():
         super().__init__()
         self.one_sol_in_lamports = 1000000000
         self.sol_address = "So11111111111111111111111111111111111111112"
-        self.helper = SolanaHelper()
+        self.helper = AsyncSolanaHelper()
         self.jupiterHelper = JupiterHelper()
         self.solanaSwapModule = SolanaSwapModule(constant.solanaTrackerURL, constant.input_mint)
+        self.swapRouter = SwapRouter(self.solanaSwapModule, self.jupiterHelper)
 
     
     
     def main(self):
         print('started bot')
-        app = Application.builder().token(TOKEN).build()
+        app = Application.builder().token(TOKEN).concurrent_updates(ChatOrderedUpdateProcessor()).post_init(self.post_init).post_shutdown(self.post_shutdown).build()
+        self.add_handlers(app)
 
+        if BOT_MODE == "webhook":
+            asyncio.run(self.run_webhook(app))
+        else:
+            # long polling: telegram answers as soon as an update arrives, start_polling also drops any webhook
+            print('polling---')
+            app.run_polling(poll_interval=0, timeout=constant.pollTimeout, allowed_updates=Update.ALL_TYPES)
+
+
+    def add_handlers(self, app: Application):
         app.add_handler(CommandHandler('main', self.main_command))
         app.add_handler(CallbackQueryHandler(self.button_click_callback))
         app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_message))
-        
-        solanaConnected = self.helper.client.is_connected()
+
+
+    async def run_webhook(self, app: Application):
+        if not WEBHOOK_URL or not WEBHOOK_SECRET:
+            # without the secret every POST would be rejected, without the URL telegram never posts
+            raise RuntimeError('webhook mode needs WEBHOOK_URL and WEBHOOK_SECRET')
+        server = WebhookServer(app, WEBHOOK_SECRET)
+        # last group, runs once the real handler of the update has finished
+        app.add_handler(TypeHandler(Update, server.handled), group=99)
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+
+        async with app:
+            await self.post_init(app)
+            await server.start()
+            await app.bot.set_webhook(
+                url=WEBHOOK_URL,
+                secret_token=WEBHOOK_SECRET,
+                allowed_updates=Update.ALL_TYPES,
+                max_connections=constant.webhookMaxConnections,
+            )
+            await app.start()
+            print('webhook---', WEBHOOK_URL)
+            try:
+                await stop.wait()
+            finally:
+                # the webhook stays registered, telegram queues updates until we are back
+                # and switching to polling removes it
+                await server.stop()
+                await app.stop()
+        await self.post_shutdown(app)
+        print('webhook latency', server.stats())
+
+
+    async def post_init(self, app: Application):
+        await ensure_indexes(db)
+        write_behind.start()
+        solanaConnected = await self.helper.client.is_connected()
         if(solanaConnected):
             print('solana Connected')
         else:
             print('failed solana Connecttion')
-            
-        print('polling---')
-        app.run_polling(poll_interval=3)
-
+        rpc_router.start()
+        blockhash_cache.start()
+        priority_fees.start()
+        ws_hub.start()
+        await confirmation_engine.start()
+
+
+    async def post_shutdown(self, app: Application):
+        await trade_queue.stop()
+        await price_cache.stop()
+        await blockhash_cache.stop()
+        await priority_fees.stop()
+        await cu_profiler.stop()
+        await rpc_router.stop()
+        await rebroadcaster.stop()
+        await confirmation_engine.stop()
+        await balance_tracker.stop()
+        await pool_prices.stop()
+        await ws_hub.stop()
+        await close_async_clients()
+        await write_behind.stop()
+        await close_http_client()
+        print('user cache', user_cache.stats())
+        print('balance tracker', balance_tracker.stats())
+        print('pool prices', pool_prices.stats())
+        print('quote prefetch', quote_prefetcher.stats())
+        print('swap router', self.swapRouter.stats())
 
     
 
     async def main_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        reply_markup = InlineKeyboardMarkup(main_keyboard)
-        await update.message.reply_text('Hello! This is Crypto Bot.', reply_markup=reply_markup)
+        await update.message.reply_text('Hello! This is Crypto Bot.', reply_markup=MAIN_MENU)
 
 
 
-    def getBalance(self, publicKey):
-        response = self.helper.getBalance(Pubkey.from_string(publicKey))
-        sol_bal = math.ceil((response.value / self.one_sol_in_lamports) * 100) / 100
+    async def getBalance(self, publicKey):
+        # served from the websocket-fed snapshot, RPC only on the first view or after a reconnect
+        lamports = await balance_tracker.lamports(publicKey)
+        sol_bal = math.ceil((lamports / self.one_sol_in_lamports) * 100) / 100
             
-        sol_price_response = requests.get('https://api.raydium.io/v2/main/price')
-        sol_price_response.raise_for_status()  # Check for HTTP errors
-        data = sol_price_response.json()
-        sol_price = data[self.sol_address]
+        # read off the SOL/USDC pool reserves, the REST price map only if that pool is unavailable
+        sol_price = await pool_prices.sol_usd()
+        if sol_price is None:
+            data = await price_cache.get_prices()
+            sol_price = data[self.sol_address]
         usd_bal =  math.ceil((sol_bal * sol_price) * 100) / 100
         return {"sol_bal":sol_bal, "usd_bal":usd_bal}
 
@@ -145,9 +215,8 @@ class Bot():
 
 
         if callback_data == 'wallet':
-            submenu_reply_markup = InlineKeyboardMarkup(submenu_keyboard)
             context.chat_data["callbackType"] = callback_data
-            await query.edit_message_text(text="Manage Wallet", reply_markup=submenu_reply_markup)
+            await query.edit_message_text(text="Manage Wallet", reply_markup=WALLET_MENU)
 
         elif callback_data == 'buy_token':
             context.chat_data["callbackType"] = callback_data
@@ -161,44 +230,45 @@ class Bot():
             msg = await self.send_message(chat_id, f"_Fetching your tokens\\.\\.\\._", context)
             retrieved_user = await get_user_by_userId(int(chat_id))
             # retrieved_user = await get_user_by_userId(int(922898192))
-            accInfo = self.helper.getAccountInfo(Pubkey.from_string(retrieved_user.publicKey))
-            print('accInfo',accInfo)
-            tokens = accInfo.value
+            positions, res = await asyncio.gather(
+                balance_tracker.token_balances(retrieved_user.publicKey),
+                self.getBalance(retrieved_user.publicKey),
+            )
             
             formatted_message = []
-            formatted_message.append(f"<b>Manage your tokens</b>\nWallet: <code>{retrieved_user.publicKey}</code>\n")
+            formatted_message.append(POSITIONS_HEADER.render(public_key=retrieved_user.publicKey))
             
+            mints = [position['mint'] for position in positions]
+            token_infos = await token_metadata.get_many(mints)
+
             show_bal = True
             message = "No information found for tokens"
             total_owned_sol = 0
             toatl_owned_sol_price = 0
-            for token in tokens:
+            # priced from subscribed pool reserves, the REST price map only for mints without a pool we can decode
+            pool_price_list = await pool_prices.prices_usd(mints)
+            sol_curr_price = pool_prices.price_usd_now(self.sol_address)
+            price_list = {}
+            if sol_curr_price is None or len(pool_price_list) < len(mints):
+                price_list = await price_cache.get_prices()
+            if sol_curr_price is None:
+                sol_curr_price = price_list[self.sol_address]
+            for position in positions:
                 if(show_bal):
-                    res = self.getBalance(retrieved_user.publicKey)
-                    formatted_message.append(f"Balance: <b>{res.get('sol_bal')} SOL (${res.get('usd_bal')})</b>")
+                    formatted_message.append(POSITIONS_BALANCE.render(sol_bal=res.get('sol_bal'), usd_bal=res.get('usd_bal')))
                     # formatted_message.append(f"Positions: <b>{res.get('sol_bal')} SOL (${res.get('usd_bal')})</b>\n")
                 show_bal = False
     
-                info = token.account.data.parsed.get('info')
-                ui_amount = info.get('tokenAmount', {}).get('uiAmount')
-                mint = info.get('mint')
-                token_info = self.get_token_info(mint)
+                ui_amount = position['ui_amount']
+                mint = position['mint']
+                token_info = token_infos.get(mint)
                 if token_info: 
                     
-                    response = requests.get('https://api.raydium.io/v2/main/price')
-                    response.raise_for_status()  # Check for HTTP errors
-                    price_list = response.json()
-                    sol_curr_price = price_list[self.sol_address]
-                    curr_price_of_token = price_list.get(mint, None)
+                    curr_price_of_token = pool_price_list.get(mint, price_list.get(mint))
                     
                     if(curr_price_of_token == None):
-                        api_url = f"https://api.dexscreener.io/latest/dex/tokens/{mint}"
-                        response = requests.get(api_url)
-                        response.raise_for_status()  # Check for HTTP errors
-                        data = response.json()
-                        if data['pairs']:
-                            t_info = data['pairs'][0]  # Get the first pair information
-                            curr_price_of_token = t_info.get('priceUsd', 'N/A')
+                        # token_info was just fetched from dexscreener, no need to ask it again
+                        curr_price_of_token = token_info['price_usd']
                     
                     # print("curr_price_of_token",curr_price_of_token)
                     # print("ui_amount",ui_amount)
@@ -212,22 +282,24 @@ class Bot():
                     toatl_owned_sol_price = toatl_owned_sol_price + rounded_price_of_owned_token
 
                     
-                    formatted_message.append(f"<b><a href='https://dexscreener.com/{chain_id}/{mint}'>{str(token_info['symbol']).upper()} - 📈</a></b> {qty_in_sol:.6f} SOL - (${rounded_price_of_owned_token:.2f})")
-           
-                    formatted_message.append(f"<code>{mint}</code>")
-                    
-                    formatted_message.append(f"● Price: <b>${token_info['price_usd']}</b>")
-                    formatted_message.append(f"● Amount (owned): <b>{ui_amount:.6f}</b>\n")
+                    formatted_message.append(POSITION_VALUE_ROW.render(
+                        chain_id=chain_id,
+                        mint=mint,
+                        symbol=str(token_info['symbol']).upper(),
+                        qty_in_sol=qty_in_sol,
+                        value_usd=rounded_price_of_owned_token,
+                        price_usd=token_info['price_usd'],
+                        ui_amount=ui_amount,
+                    ))
                     
                     # message = "\n".join(formatted_message)
     
-            formatted_message.insert(2, f"Positions: <b>{total_owned_sol:.6} SOL (${toatl_owned_sol_price:.6})</b>\n")
+            formatted_message.insert(2, POSITIONS_TOTAL.render(total_sol=total_owned_sol, total_usd=toatl_owned_sol_price))
             message = "\n".join(formatted_message)
             print("formatted_message",formatted_message)
             await self.edit_message_text(text=message, chat_id = chat_id, message_id = msg.message_id, context = context, parseMode=ParseMode.HTML)
         elif callback_data == 'back_to_main':
-            main_reply_markup = InlineKeyboardMarkup(main_keyboard)
-            await query.edit_message_text(text="Hello! This is Crypto Bot, how can I help.", reply_markup=main_reply_markup)
+            await query.edit_message_text(text="Hello! This is Crypto Bot, how can I help.", reply_markup=MAIN_MENU)
         elif callback_data == 'generate_wallet':
 
             retrieved_user = await get_user_by_userId(int(chat_id))
@@ -257,15 +329,11 @@ class Bot():
             retrieved_user = await get_user_by_userId(int(chat_id))
             if(retrieved_user):
                 try:
-                    res = self.getBalance(retrieved_user.publicKey)
+                    res = await self.getBalance(retrieved_user.publicKey)
                     
-                    message = (
-                        f"*Wallet Balance*\n"
-                        f"`{retrieved_user.publicKey}` _\\(Tap to copy\\)_ \n"
-                        f"Balance: {self.escape_dots(res.get('sol_bal'))} SOL  \\(💲{self.escape_dots(res.get('usd_bal'))}\\)"
-                    )
+                    message = WALLET_BALANCE.render(public_key=retrieved_user.publicKey, sol_bal=res.get('sol_bal'), usd_bal=res.get('usd_bal'))
                     await self.send_message(chat_id, message, context)
-                except requests.exceptions.HTTPError as http_err:
+                except httpx.HTTPStatusError as http_err:
                     print(f"HTTP error occurred: {http_err}")
                 except Exception as err:
                     print(f"Other error occurred: {err}")
@@ -274,11 +342,11 @@ class Bot():
         elif callback_data == 'send_sol':
             await self.send_message(chat_id, f"Enter receiver\\'s public key to send SOL to", context, None, callback_data)    
         elif callback_data == 'buy_0.1_sol':
-            await self.buyToken(chat_id, context, tmpPubkey, tmpCallBackType, 0.1)   
+            await self.buyToken(chat_id, context, tmpPubkey, tmpCallBackType, 0.1, query.message.message_id)   
         elif callback_data == 'buy_0.5_sol':
-            await self.buyToken(chat_id, context, tmpPubkey, tmpCallBackType, 0.5)   
+            await self.buyToken(chat_id, context, tmpPubkey, tmpCallBackType, 0.5, query.message.message_id)   
         elif callback_data == 'buy_1_sol':
-            await self.buyToken(chat_id, context, tmpPubkey, tmpCallBackType, 1)
+            await self.buyToken(chat_id, context, tmpPubkey, tmpCallBackType, 1, query.message.message_id)
         elif callback_data == 'buy_x_sol':
             await self.send_message(chat_id, f"Please enter the amount of SOL you want to swap:", context, None, tmpCallBackType, tmpPubkey)    
         elif callback_data == 'sell_x_percent':
@@ -286,36 +354,13 @@ class Bot():
 
 
 
-    def get_token_info(self, token_address):
+    async def get_token_info(self, token_address):
         try:
-            api_url = f"https://api.dexscreener.io/latest/dex/tokens/{token_address}"
-            response = requests.get(api_url)
-            response.raise_for_status()  # Check for HTTP errors
-            data = response.json()
-            # return None
-            if data['pairs']:
-                token_info = data['pairs'][0]  # Get the first pair information
-                return {
-                    "name": token_info['baseToken']['name'],
-                    "symbol": token_info['baseToken']['symbol'],
-                    "price_usd": token_info.get('priceUsd', 'N/A'),
-                    "liquidity_usd": token_info.get('liquidity', {}).get('usd', 'N/A'),
-                    "fdv": token_info.get('fdv', 'N/A')
-                }
-            else:
-                return None
-        except requests.exceptions.HTTPError as http_err:
-            print(f"HTTP error occurred: {http_err}")
+            return await token_metadata.get(token_address)
         except Exception as err:
             print(f"Other error occurred: {err}")
 
 
-    def escape_dots(self, value):
-        value_str = str(value)
-        escaped_str = re.sub(r'\.', r'\\.', value_str)
-        return escaped_str
-
-
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         text = update.message.text
         response = f"{text}"
@@ -343,9 +388,13 @@ class Bot():
                 elif(tmpCallBackType == "buy_token"):                 
                     token_address = token_addresses[0]
                     print('-address', token_address)
-                    token_info = self.get_token_info(token_address)
+                    token_info = await self.get_token_info(token_address)
                     # print('token_info>>>>>>>>>>>>>>>>>', token_info, "public_key>>>>>>>>>", public_key)
                     if token_info:
+                        retrieved_user = await get_user_by_userId(int(chat_id))
+                        if retrieved_user:
+                            # quote the buy buttons while the user reads the card
+                            self.solanaSwapModule.prefetch_quotes(token_address, constant.buyAmounts, constant.swapSlippageBps, retrieved_user.publicKey)
                         await self.send_token_info_and_swap_menu(chat_id, token_info, token_address, context, message_id=update.message.message_id, callBackType = tmpCallBackType, publicKey = public_key)
                     else:
                         await self.send_message(chat_id, f"Token information not found for address: {token_address}", context)
@@ -366,14 +415,14 @@ class Bot():
                     return
 
                 if(tmpPubkey is not None):
-                    await self.buyToken(chat_id, context, tmpPubkey, tmpCallBackType, inputAmount)
+                    await self.buyToken(chat_id, context, tmpPubkey, tmpCallBackType, inputAmount, update.message.message_id)
                 else:
                     print('---else',context)
                     await self.send_message(chat_id, f"Enter receiver\\'s public key", context)
             elif re.match(r'^\d+(\.\d+)?%$', text):
                 percentage = float(text.strip('%'))
                 print('percentage-', percentage)
-                await self.send_message(chat_id, f"Percentage set to {self.escape_dots(percentage)}\\% SOL", context)
+                await self.send_message(chat_id, f"Percentage set to {escape_md(percentage)}\\% SOL", context)
             else:
                 print('private chat replyback')
                 msg = await self.send_message(chat_id, response, context, message_id=update.message.message_id)
@@ -400,62 +449,30 @@ class Bot():
 
 
     async def send_token_info_and_swap_menu(self, chat_id, token_info, token_address, context: ContextTypes.DEFAULT_TYPE, message_id=None, callBackType = "", publicKey = ""):
-        # global buy_flag
-        buy_button_text = "----BUY ✅----" # if buy_flag else "BUY"
-        sell_button_text = "----SELL 🔴----" # if not buy_flag else "SELL"
-
-        # selected_option.setdefault(chat_id, {"buy": None, "sell": None})
-
-        buy_0_1_sol_text = "0.1 SOL" # if selected_option[chat_id]["buy"] == "0.1_sol" else "0.1 SOL"
-        buy_0_5_sol_text = "0.5 SOL" # if selected_option[chat_id]["buy"] == "0.5_sol" else "0.5 SOL"
-        buy_1_sol_text = "1 SOL" # if selected_option[chat_id]["buy"] == "1_sol" else "1 SOL"
-
-        sell_50_text = "Sell 50%" #if selected_option[chat_id]["sell"] == "50" else "Sell 50%"
-        sell_100_text = "Sell 100%" #if selected_option[chat_id]["sell"] == "100" else "Sell 100%"
-        sell_25_text = "Sell 25%" #if selected_option[chat_id]["sell"] == "25" else "Sell 25%"
-
-        token_info_message = (
-            f"Buy *{token_info['symbol']}* \\- {token_info['name']} [📈](https://dexscreener.com/{chain_id}/{token_address})\n"
-            f"`{token_address}` _\\(Tap to copy\\)_ \n\n"
-            f"Price: *${self.escape_dots(token_info['price_usd'])}*\n"
-            f"Liquidity: *{self.escape_dots(locale.currency(token_info['liquidity_usd'], grouping=True))}*\n"
-            f"FDV: *{self.escape_dots(locale.currency(token_info['fdv'], grouping=True))}*\n"
-            # f"__Choose an action__\\:"
+        try:
+            # only a first view of the token looks its pool up, later ones find the reserves in memory
+            await asyncio.wait_for(asyncio.shield(pool_prices.track([token_address, self.sol_address])), constant.buyPreviewWait)
+        except asyncio.TimeoutError:
+            pass
+        price_usd = pool_prices.price_usd_now(token_address) or token_info['price_usd']
+        token_info_message = TOKEN_CARD.render(
+            symbol=token_info['symbol'],
+            name=token_info['name'],
+            chain_id=chain_id,
+            token_address=token_address,
+            price_usd=price_usd,
+            liquidity_usd=locale.currency(token_info['liquidity_usd'], grouping=True),
+            fdv=locale.currency(token_info['fdv'], grouping=True),
         )
+        previews = quote_buys(token_address)
+        if previews:
+            token_info_message += "\n" + "".join(BUY_PREVIEW_ROW.render(symbol=token_info['symbol'], **preview) for preview in previews)
         
         amount = 123456453453252
         usd_string = locale.currency(amount, grouping=True)
         print('curr',usd_string)
 
-        reply_keyboard = InlineKeyboardMarkup([
-            [
-                {"text": buy_button_text, "callback_data": "toggle_buy_mode"}
-            ],
-            [
-                {"text": buy_0_1_sol_text, "callback_data": "buy_0.1_sol"},
-                {"text": buy_0_5_sol_text, "callback_data": "buy_0.5_sol"},
-            ],
-            [
-                {"text": buy_1_sol_text, "callback_data": "buy_1_sol"},
-                {"text": "Buy with X SOL", "callback_data": "buy_x_sol"}
-            ],
-            # [
-            #     {"text": sell_button_text, "callback_data": "toggle_sell_mode"}
-            # ],
-            # [
-            #     {"text": sell_25_text, "callback_data": "sell_25_percent"},
-            #     {"text": sell_50_text, "callback_data": "sell_50_percent"},
-            # ],
-            # [
-            #     {"text": sell_100_text, "callback_data": "sell_100_percent"},
-            #     {"text": "Sell X%", "callback_data": "sell_x_percent"}
-            # ],
-            # [
-            #     {"text": "Execute", "callback_data": "execute_trade"}
-            # ]
-        ])
-
-        await self.send_message(chat_id, token_info_message, context, reply_keyboard,callbackType = callBackType,userFilledPubkey = publicKey, message_id = message_id)
+        await self.send_message(chat_id, token_info_message, context, SWAP_MENU,callbackType = callBackType,userFilledPubkey = publicKey, message_id = message_id)
 
 
 
@@ -467,47 +484,58 @@ class Bot():
         return base64.b64decode(encoded_key)
     
     
-    async def buyToken(self, chat_id, context, tmpPubkey, tmpCallBackType, inputAmount):
-        amount = int(inputAmount * self.one_sol_in_lamports)
+    async def buyToken(self, chat_id, context, tmpPubkey, tmpCallBackType, inputAmount, message_id=None):
         retrieved_user = await get_user_by_userId(int(chat_id))
         if(retrieved_user):
-            sender = Keypair.from_base58_string(retrieved_user.keypair)
-            receiver = Pubkey.from_string(tmpPubkey)
-            if(tmpCallBackType == "transfer_token"):
-                txn = self.helper.transactionFun(sender, receiver, amount)
-                msg = await self.send_message(chat_id, f"__Transferring SOL__", context)
-                # await asyncio.sleep(3)
-                if(txn):
-                    print('txn:-',txn)
-                    message = []
-                    message.append(f"✅<b><a href='https://solscan.io/tx/{txn}?cluster=devnet'>SOL</a></b> transferred Successfully\n")
-                    message.append(f"<b>Sender</b>: <i><code>{sender.pubkey()}</code></i>\n")
-                    message.append(f"<b>Receiver</b>: <i><code>{receiver}</code></i>\n")
-                    message.append(f"Amount: <b>{inputAmount} SOL</b>\n")
-                    formatted_message = "\n".join(message)
-                    await self.edit_message_text(text=formatted_message, chat_id = chat_id, message_id = msg.message_id, context = context, parseMode=ParseMode.HTML)
+            # a double tap or a redelivered callback carries the same message_id
+            key = (chat_id, tmpCallBackType, tmpPubkey, inputAmount, message_id)
+            task = trade_queue.submit(key, retrieved_user.publicKey, lambda: self.executeTrade(chat_id, context, retrieved_user, tmpPubkey, tmpCallBackType, inputAmount))
+            if task is None:
+                if trade_queue.is_running(key):
+                    await self.send_message(chat_id, f"⏳ This trade is already in progress", context)
                 else:
-                    await self.send_message(chat_id, f"🔴 Insufficient Balance", context)
-            elif(tmpCallBackType == "buy_token"):
-                # need to work from here 
-                msg = await self.send_message(chat_id, f"__Processing swap__", context)
-
-                # tmpJupiterHel = self.jupiterHelper.initializeJup(sender)
-                self.solanaSwapModule.initializeTracker(sender)
-                slippage = 100  # 1% slippage in basis points
-                jup_txn_id = await self.solanaSwapModule.execute_swap(tmpPubkey, inputAmount, slippage, sender)
-                # jup_txn_id = await self.jupiterHelper.execute_swap(tmpPubkey, amount, slippage, sender)
-                if not jup_txn_id:
-                    print('txn failed>>>>>>')
-                    await self.edit_message_text(text=f"There is some technical issue while buying the token", chat_id = chat_id, message_id = msg.message_id, context = context)
-                else:
-                    await self.edit_message_text(text=f"[SOL](https://solscan.io/tx/{jup_txn_id}) bought successfully", chat_id = chat_id, message_id = msg.message_id, context = context)
-                
-
+                    await self.send_message(chat_id, f"This trade was just submitted, tap again to repeat it", context)
         else:
             await self.send_message(chat_id, f"You don\'t have any wallet to send SOL", context)
 
 
+    async def executeTrade(self, chat_id, context, retrieved_user, tmpPubkey, tmpCallBackType, inputAmount):
+        amount = int(inputAmount * self.one_sol_in_lamports)
+        sender = Keypair.from_base58_string(retrieved_user.keypair)
+        receiver = Pubkey.from_string(tmpPubkey)
+        if(tmpCallBackType == "transfer_token"):
+            txn = await self.helper.transactionFun(sender, receiver, amount)
+            record_trade(chat_id, "transfer", str(receiver), inputAmount, txn)
+            msg = await self.send_message(chat_id, f"__Transferring SOL__", context)
+            # await asyncio.sleep(3)
+            if(txn):
+                print('txn:-',txn)
+                message = []
+                message.append(f"✅<b><a href='https://solscan.io/tx/{txn}?cluster=devnet'>SOL</a></b> transferred Successfully\n")
+                message.append(f"<b>Sender</b>: <i><code>{sender.pubkey()}</code></i>\n")
+                message.append(f"<b>Receiver</b>: <i><code>{receiver}</code></i>\n")
+                message.append(f"Amount: <b>{inputAmount} SOL</b>\n")
+                formatted_message = "\n".join(message)
+                await self.edit_message_text(text=formatted_message, chat_id = chat_id, message_id = msg.message_id, context = context, parseMode=ParseMode.HTML)
+            else:
+                await self.send_message(chat_id, f"🔴 Insufficient Balance", context)
+        elif(tmpCallBackType == "buy_token"):
+            # need to work from here 
+            msg = await self.send_message(chat_id, f"__Processing swap__", context)
+
+            # tmpJupiterHel = self.jupiterHelper.initializeJup(sender)
+            slippage = constant.swapSlippageBps
+            jup_txn_id = await self.swapRouter.execute_swap(tmpPubkey, inputAmount, slippage, sender)
+            record_trade(chat_id, "buy", tmpPubkey, inputAmount, jup_txn_id)
+            # jup_txn_id = await self.jupiterHelper.execute_swap(tmpPubkey, amount, slippage, sender)
+            if not jup_txn_id:
+                print('txn failed>>>>>>')
+                await self.edit_message_text(text=f"There is some technical issue while buying the token", chat_id = chat_id, message_id = msg.message_id, context = context)
+            else:
+                await self.edit_message_text(text=f"[SOL](https://solscan.io/tx/{jup_txn_id}) bought successfully", chat_id = chat_id, message_id = msg.message_id, context = context)
+
+
+
 
 
 
@@ -549,46 +577,70 @@ async def insert_user(user_data: UserModel):
     try:
         # convert the Pydantic model to a dictionary
         wallet_dict = user_data.dict(by_alias=True)
-        result = wallet_collection.insert_one(wallet_dict)
+        result = await wallet_collection.insert_one(wallet_dict)
+        user_cache.invalidate(user_data.userId)
         print(f'User inserted with id: {result.inserted_id}')
     except Exception as e:
         print(f'Error inserting user: {e}')
         
 
 async def get_user_by_userId(userId: int) -> Optional[UserModel]:
+    cached = user_cache.get(userId)
+    if cached is not None:
+        return cached
+    generation = user_cache.begin_read(userId)
     try:
-        wallet_dict = wallet_collection.find_one({"userId": userId})
-        print('walleteddddd',wallet_dict)
+        wallet_dict = await wallet_collection.find_one({"userId": userId}, USER_PROJECTION)
         if wallet_dict:
-            return UserModel(**wallet_dict)
+            # settings written behind may not have reached mongo yet
+            wallet_dict.update(write_behind.pending_fields("wallet", {"userId": userId}))
+            user = UserModel(**wallet_dict)
+            user_cache.put_if_unchanged(userId, user, generation)
+            return user
     except Exception as e:
         print(f'Error getting user: {e}')
+    finally:
+        user_cache.end_read(userId)
     return None
 
-def get_users() -> list[UserModel]:
+async def get_users(batch_size: int = constant.userBatchSize, after_id=None, validate: bool = True):
+    # async generator: pages through the collection by _id instead of loading every wallet
     try:
-        users = []
-        for user_dict in wallet_collection.find():
-            users.append(UserModel(**user_dict))
-        return users
+        async for user in iter_users(wallet_collection, UserModel, batch_size, after_id, validate):
+            yield user
     except Exception as e:
         print(f'Error getting all users: {e}')
-        return []
 
 async def update_user(userId: int, update_data: dict):
+    # non-critical: queued and written in the next bulk flush, the handler does not wait on Atlas
     try:
-        result = await wallet_collection.update_one({"userId": userId}, {"$set": update_data})
-        print('update_user result',result)
-        if result.modified_count:
-            print(f'User updated')
+        write_behind.set_fields("wallet", {"userId": userId}, update_data)
+        cached = user_cache.get(userId)
+        if cached is not None:
+            user_cache.put(userId, cached.model_copy(update=update_data))
         else:
-            print(f'No user found with userId: {userId}')
+            # voids a read of this user that is still in flight
+            user_cache.invalidate(userId)
     except Exception as e:
         print(f'Error updating user: {e}')
 
-def delete_user(userId: str):
+def record_trade(userId: int, kind: str, mint: str, amountSol: float, signature):
+    trade = {
+        "userId": int(userId),
+        "kind": kind,
+        "mint": mint,
+        "amountSol": amountSol,
+        "status": "submitted" if isinstance(signature, (str, Signature)) and signature else "failed",
+        "createdAt": datetime.datetime.now(datetime.timezone.utc),
+    }
+    if trade["status"] == "submitted":
+        trade["signature"] = str(signature)
+    write_behind.insert("trades", trade)
+
+async def delete_user(userId: str):
     try:
-        result = wallet_collection.delete_one({"userId": userId})
+        result = await wallet_collection.delete_one({"userId": userId})
+        user_cache.invalidate(userId)
         if result.deleted_count:
             print(f'User deleted')
         else:
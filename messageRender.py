@@ -0,0 +1,139 @@
+import html
+import re
+from string import Formatter
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+# every character telegram wants escaped in MarkdownV2 text
+MARKDOWN_V2_SPECIAL = "\\_*[]()~`>#+-=|{}.!"
+_MARKDOWN_V2_PATTERN = re.compile("[" + re.escape(MARKDOWN_V2_SPECIAL) + "]")
+
+
+def _escape_char(match):
+    return "\\" + match.group()
+
+
+def escape_md(value):
+    """Escape a value for MarkdownV2 in a single pass over the string."""
+    # a callable replacement is cheaper than a template one, and strings without
+    # special characters (addresses, symbols) come back untouched
+    return _MARKDOWN_V2_PATTERN.sub(_escape_char, str(value))
+
+
+def escape_html(value):
+    return html.escape(str(value))
+
+
+class Template():
+    def __init__(
+        self,
+        text,
+        escape=escape_md,
+    ):
+        """A message whose static text is written pre-escaped; only `{fields}` are formatted and escaped at render time."""
+        super().__init__()
+        self.escape = escape
+        # parsed once, rendering is then a plain join
+        self.parts = [(literal, field, spec or "") for literal, field, spec, _ in Formatter().parse(text)]
+
+    def render(self, **fields):
+        escape = self.escape
+        out = []
+        for literal, field, spec in self.parts:
+            out.append(literal)
+            if field is not None:
+                out.append(escape(format(fields[field], spec)))
+        return "".join(out)
+
+
+MAIN_MENU = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("Buy Tokens", callback_data="buy_token"),
+        InlineKeyboardButton("Positions", callback_data="positions"),
+    ],
+    [
+        InlineKeyboardButton("Wallet", callback_data="wallet"),
+        InlineKeyboardButton("Settings", callback_data="settings"),
+    ],
+    [
+        InlineKeyboardButton("Transfer Token", callback_data="transfer_token"),
+    ],
+    [
+        InlineKeyboardButton("List tokens", callback_data="list_token"),
+    ],
+])
+
+WALLET_MENU = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("Generate Wallet", callback_data='generate_wallet'),
+    ],
+    [
+        InlineKeyboardButton("Export Private Key", callback_data='export_private_key'),
+        InlineKeyboardButton("Check Balance", callback_data='get_balance'),
+    ],
+    [
+        InlineKeyboardButton("Withdraw SOL", callback_data='withdraw_sol'),
+        InlineKeyboardButton("Send SOL", callback_data='send_sol'),
+    ],
+    [
+        InlineKeyboardButton("Back", callback_data='back_to_main'),
+    ]
+])
+
+SWAP_MENU = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("----BUY ✅----", callback_data="toggle_buy_mode"),
+    ],
+    [
+        InlineKeyboardButton("0.1 SOL", callback_data="buy_0.1_sol"),
+        InlineKeyboardButton("0.5 SOL", callback_data="buy_0.5_sol"),
+    ],
+    [
+        InlineKeyboardButton("1 SOL", callback_data="buy_1_sol"),
+        InlineKeyboardButton("Buy with X SOL", callback_data="buy_x_sol"),
+    ],
+])
+
+# MarkdownV2
+TOKEN_CARD = Template(
+    "Buy *{symbol}* \\- {name} [📈](https://dexscreener.com/{chain_id}/{token_address})\n"
+    "`{token_address}` _\\(Tap to copy\\)_ \n\n"
+    "Price: *${price_usd}*\n"
+    "Liquidity: *{liquidity_usd}*\n"
+    "FDV: *{fdv}*\n"
+)
+
+BUY_PREVIEW_ROW = Template(
+    "{sol_amount} SOL ➜ *{out_amount:,.2f}* {symbol} \\(impact {price_impact:.2%}, min {min_received:,.2f}\\)\n"
+)
+
+WALLET_BALANCE = Template(
+    "*Wallet Balance*\n"
+    "`{public_key}` _\\(Tap to copy\\)_ \n"
+    "Balance: {sol_bal} SOL  \\(💲{usd_bal}\\)"
+)
+
+# HTML
+POSITIONS_HEADER = Template(
+    "<u><b>Manage your tokens</b></u>\nWallet: <code>{public_key}</code>\n",
+    escape_html,
+)
+
+POSITIONS_BALANCE = Template("Balance: <b>{sol_bal} SOL (${usd_bal})</b>\n", escape_html)
+
+POSITION_ROW = Template(
+    "<b>{name}</b> - {symbol}\n"
+    "<code>{mint}</code>\n"
+    "Amount: {ui_amount:.6f}\n",
+    escape_html,
+)
+
+POSITION_VALUE_ROW = Template(
+    "<b><a href='https://dexscreener.com/{chain_id}/{mint}'>{symbol} - 📈</a></b> {qty_in_sol:.6f} SOL - (${value_usd:.2f})\n"
+    "<code>{mint}</code>\n"
+    "● Price: <b>${price_usd}</b>\n"
+    "● Amount (owned): <b>{ui_amount:.6f}</b>\n",
+    escape_html,
+)
+
+POSITIONS_TOTAL = Template("Positions: <b>{total_sol:.6} SOL (${total_usd:.6})</b>\n", escape_html)
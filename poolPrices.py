@@ -0,0 +1,334 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+from solana.rpc.commitment import Confirmed
+from solders.account_decoder import UiAccountEncoding
+from solders.commitment_config import CommitmentLevel
+from solders.pubkey import Pubkey
+from solders.rpc.config import RpcAccountInfoConfig
+from solders.rpc.requests import AccountSubscribe, AccountUnsubscribe
+
+import constant
+from balanceTracker import token_amount
+from httpSession import get_http_client
+from rpcRouter import rpc_router
+from solanaWs import ws_hub
+
+WSOL = constant.input_mint
+USDC = constant.usdcMint
+COUNTER_MINTS = (WSOL, USDC)  # what a pool's other side must be for its price to be usable
+RAYDIUM_POOL_SIZE = 752
+MAX_ACCOUNTS_PER_CALL = 100  # getMultipleAccounts limit
+
+
+def u64(data: bytes, offset):
+    return int.from_bytes(data[offset:offset + 8], "little")
+
+
+def pubkey_at(data: bytes, offset):
+    return str(Pubkey.from_bytes(data[offset:offset + 32]))
+
+
+def decode_raydium_pool(data: bytes):
+    """Raydium AMM v4 pool state: reserves sit in the two vaults, minus the pnl the pool still owes."""
+    return {
+        "base_decimals": u64(data, 32),
+        "quote_decimals": u64(data, 40),
+        "fee_bps": u64(data, 176) * 10000 / max(u64(data, 184), 1),  # swapFeeNumerator / swapFeeDenominator
+        "base_pnl": u64(data, 192),
+        "quote_pnl": u64(data, 200),
+        "base_vault": pubkey_at(data, 336),
+        "quote_vault": pubkey_at(data, 368),
+        "base_mint": pubkey_at(data, 400),
+        "quote_mint": pubkey_at(data, 432),
+    }
+
+
+def decode_pump_curve(data: bytes):
+    """pump.fun bonding curve: 8 byte discriminator, then the virtual reserves the curve prices from."""
+    return {
+        "virtual_token": u64(data, 8),
+        "virtual_sol": u64(data, 16),
+        "complete": data[48] == 1,
+    }
+
+
+def mid_price(pool):
+    """Price of `pool["mint"]` in units of the pool's other mint, None while a side is empty."""
+    if not pool["base_reserve"] or not pool["quote_reserve"]:
+        return None
+    base = pool["base_reserve"] / 10 ** pool["base_decimals"]
+    quote = pool["quote_reserve"] / 10 ** pool["quote_decimals"]
+    return quote / base if pool["base_mint"] == pool["mint"] else base / quote
+
+
+class PoolPriceEngine():
+    def __init__(self, hub=ws_hub, max_pools=constant.poolPriceMaxPools, retry=constant.poolDiscoveryRetry):
+        """Token prices computed from AMM pool reserves, kept current by accountSubscribe on the reserve accounts."""
+        super().__init__()
+        self.hub = hub
+        self.max_pools = max_pools
+        self.retry = retry
+        self.pools = OrderedDict()  # mint -> pool, least recently priced first
+        self.prices = {}  # mint -> (price, counter mint)
+        self.unpriced = {}  # mint -> monotonic time no decodable pool was found, oldest first
+        self._discovering = {}  # mint -> discovery task
+        self._refreshing = {}  # mint -> refresh task of its pool
+        self._config = RpcAccountInfoConfig(encoding=UiAccountEncoding.Base64, commitment=CommitmentLevel.Confirmed)
+
+    def _is_live(self, pool):
+        if pool["connection"] != self.hub.connections or not self.hub.connected.is_set():
+            return False
+        # a reserve account whose re-subscribe failed after a reconnect would freeze the price
+        return all(
+            address in pool["handles"] and self.hub.is_active(pool["handles"][address])
+            for address in pool["accounts"]
+        )
+
+    def _new_pool(self, mint, address, account):
+        data = bytes(account.data)
+        owner = str(account.owner)
+        if owner == constant.raydiumAmmProgram and len(data) == RAYDIUM_POOL_SIZE:
+            state = decode_raydium_pool(data)
+            sides = (state["base_mint"], state["quote_mint"])
+            if mint not in sides:
+                return None
+            counter = sides[1] if sides[0] == mint else sides[0]
+            if counter == mint or counter not in COUNTER_MINTS:
+                return None
+            pool = {"kind": "raydium", "accounts": [state["base_vault"], state["quote_vault"]], **state}
+        elif owner == constant.pumpFunProgram and len(data) > 48:
+            if decode_pump_curve(data)["complete"]:
+                # migrated, the liquidity now sits in another pool
+                return None
+            pool = {
+                "kind": "pumpfun",
+                "accounts": [address],
+                "base_mint": mint,
+                "quote_mint": WSOL,
+                "base_decimals": 6,
+                "quote_decimals": 9,
+                "fee_bps": constant.pumpFunFeeBps,
+            }
+        else:
+            return None
+        pool.update({
+            "mint": mint,
+            "address": address,
+            "base_reserve": 0,
+            "quote_reserve": 0,
+            "slots": {},  # reserve account -> slot of its last update
+            "handles": {},  # reserve account -> ws_hub handle
+            "connection": None,
+        })
+        return pool
+
+    def _apply(self, pool, address, data: bytes, slot):
+        if self.pools.get(pool["mint"]) is not pool or slot < pool["slots"].get(address, 0):
+            return
+        pool["slots"][address] = slot
+        if pool["kind"] == "raydium":
+            if address == pool["base_vault"]:
+                pool["base_reserve"] = max(token_amount(data) - pool["base_pnl"], 0)
+            else:
+                pool["quote_reserve"] = max(token_amount(data) - pool["quote_pnl"], 0)
+        else:
+            curve = decode_pump_curve(data)
+            if curve["complete"]:
+                # look for the pool it migrated to on the next read
+                asyncio.create_task(self._drop(pool["mint"]))
+                return
+            pool["base_reserve"] = curve["virtual_token"]
+            pool["quote_reserve"] = curve["virtual_sol"]
+        price = mid_price(pool)
+        if price is not None:
+            counter = pool["quote_mint"] if pool["base_mint"] == pool["mint"] else pool["base_mint"]
+            self.prices[pool["mint"]] = (price, counter)
+
+    async def _get_accounts(self, addresses):
+        """{address: Account or None} and the slot of the oldest answer."""
+        accounts = {}
+        slot = None
+        for i in range(0, len(addresses), MAX_ACCOUNTS_PER_CALL):
+            chunk = addresses[i:i + MAX_ACCOUNTS_PER_CALL]
+            response = await rpc_router.call("get_multiple_accounts", [Pubkey.from_string(a) for a in chunk], Confirmed)
+            accounts.update(zip(chunk, response.value))
+            slot = response.context.slot if slot is None else min(slot, response.context.slot)
+        return accounts, slot
+
+    async def _refresh(self, pools):
+        connection = self.hub.connections if self.hub.connected.is_set() else None
+        # subscribe before reading the reserves, a swap landing in between is then not lost
+        await asyncio.gather(*(self._subscribe(pool) for pool in pools))
+        accounts, slot = await self._get_accounts([address for pool in pools for address in pool["accounts"]])
+        for pool in pools:
+            for address in pool["accounts"]:
+                account = accounts.get(address)
+                if account is not None:
+                    self._apply(pool, address, bytes(account.data), slot)
+            pool["connection"] = connection
+
+    async def _subscribe(self, pool):
+        for address in pool["accounts"]:
+            handle = pool["handles"].get(address)
+            if handle is not None:
+                if self.hub.is_active(handle) or not self.hub.connected.is_set():
+                    # flowing, or re-sent by the hub on the next connect
+                    continue
+                # the re-subscribe after a reconnect failed, the server does not know this handle
+                self.hub.forget(handle)
+                del pool["handles"][address]
+            handle = await self.hub.subscribe(
+                lambda request_id, pubkey=Pubkey.from_string(address): AccountSubscribe(pubkey, self._config, request_id),
+                lambda subscription, request_id: AccountUnsubscribe(subscription, request_id),
+                lambda notification, address=address: self._apply(
+                    pool, address, bytes(notification.result.value.data), notification.result.context.slot
+                ),
+            )
+            if self.pools.get(pool["mint"]) is not pool:
+                # evicted while subscribing
+                await self.hub.unsubscribe(handle)
+                continue
+            pool["handles"][address] = handle
+
+    async def _candidates(self, mints):
+        """mint -> pool addresses worth checking, most liquid first; REST is only used here."""
+        candidates = {mint: [] for mint in mints}
+        if WSOL in candidates:
+            candidates[WSOL].append(constant.solUsdcPool)
+        tokens = [mint for mint in mints if mint != WSOL]
+        chunks = [tokens[i:i + constant.dexscreenerBatchSize] for i in range(0, len(tokens), constant.dexscreenerBatchSize)]
+        for chunk in chunks:
+            response = await get_http_client().get(constant.dexscreenerTokensURL + ",".join(chunk))
+            response.raise_for_status()  # Check for HTTP errors
+            pairs = response.json().get('pairs') or []
+            pairs.sort(key=lambda pair: (pair.get('liquidity') or {}).get('usd') or 0, reverse=True)
+            for pair in pairs:
+                if pair.get('dexId') not in ("raydium", "pumpfun"):
+                    continue
+                for side in ('baseToken', 'quoteToken'):
+                    mint = (pair.get(side) or {}).get('address')
+                    if mint in candidates and len(candidates[mint]) < constant.poolDiscoveryCandidates:
+                        candidates[mint].append(pair['pairAddress'])
+        return candidates
+
+    async def _discover(self, mints):
+        candidates = await self._candidates(mints)
+        accounts, _ = await self._get_accounts(list(dict.fromkeys(a for addresses in candidates.values() for a in addresses)))
+        found = []
+        for mint, addresses in candidates.items():
+            pool = None
+            for address in addresses:
+                if accounts.get(address) is not None:
+                    pool = self._new_pool(mint, address, accounts[address])
+                if pool is not None:
+                    break
+            # re-inserted so the dict stays ordered by time
+            self.unpriced.pop(mint, None)
+            if pool is None:
+                self.unpriced[mint] = time.monotonic()
+                continue
+            self.pools[mint] = pool
+            found.append(pool)
+        if found:
+            await asyncio.gather(*self._start_refresh(found))
+
+    def _forget_discovery(self, mints):
+        for mint in mints:
+            self._discovering.pop(mint, None)
+
+    def _start_refresh(self, pools):
+        """The refresh tasks covering `pools`: concurrent readers of a stale pool share one subscribe and read."""
+        new = [pool for pool in pools if pool["mint"] not in self._refreshing]
+        if new:
+            task = asyncio.create_task(self._refresh(new))
+            task.add_done_callback(lambda task, new=new: self._forget_refresh(new, task))
+            for pool in new:
+                self._refreshing[pool["mint"]] = task
+        return {self._refreshing[pool["mint"]] for pool in pools}
+
+    def _forget_refresh(self, pools, task):
+        for pool in pools:
+            if self._refreshing.get(pool["mint"]) is task:
+                del self._refreshing[pool["mint"]]
+
+    async def track(self, mints):
+        """Make sure every mint with a usable pool is subscribed and its reserves are current."""
+        mints = list(dict.fromkeys(mints))
+        now = time.monotonic()
+        for mint in mints:
+            if mint in self.pools:
+                self.pools.move_to_end(mint)
+
+        missing = [
+            mint for mint in mints
+            if mint not in self.pools and now - self.unpriced.get(mint, -self.retry) >= self.retry
+        ]
+        new = [mint for mint in missing if mint not in self._discovering]
+        if new:
+            task = asyncio.create_task(self._discover(new))
+            task.add_done_callback(lambda task, new=new: self._forget_discovery(new))
+            for mint in new:
+                self._discovering[mint] = task
+        waits = {self._discovering[mint] for mint in missing if mint in self._discovering}
+
+        stale = [self.pools[mint] for mint in mints if mint in self.pools and not self._is_live(self.pools[mint])]
+        if stale:
+            waits |= self._start_refresh(stale)
+        for result in await asyncio.gather(*waits, return_exceptions=True):
+            if isinstance(result, Exception):
+                print(f'Error tracking pool prices: {result}')
+        await self._evict()
+
+    def price_usd_now(self, mint):
+        """USD price from memory only, None when the mint has no tracked pool."""
+        entry = self.prices.get(mint)
+        if entry is None:
+            return None
+        price, counter = entry
+        if counter == USDC:
+            return price
+        sol = self.prices.get(WSOL)
+        return price * sol[0] if sol is not None else None
+
+    async def sol_usd(self):
+        await self.track([WSOL])
+        return self.price_usd_now(WSOL)
+
+    async def prices_usd(self, mints):
+        """mint -> USD price for the mints a pool could be found for."""
+        await self.track(list(mints) + [WSOL])
+        prices = {}
+        for mint in mints:
+            price = self.price_usd_now(mint)
+            if price is not None:
+                prices[mint] = price
+        return prices
+
+    async def _drop(self, mint):
+        pool = self.pools.pop(mint, None)
+        self.prices.pop(mint, None)
+        if pool is None:
+            return
+        for handle in pool["handles"].values():
+            await self.hub.unsubscribe(handle)
+
+    async def _evict(self):
+        # a mint without a pool is only remembered until it may be looked up again
+        now = time.monotonic()
+        while self.unpriced and now - next(iter(self.unpriced.values())) >= self.retry:
+            self.unpriced.pop(next(iter(self.unpriced)))
+        while len(self.pools) > self.max_pools:
+            mint = next(mint for mint in self.pools if mint != WSOL)
+            await self._drop(mint)
+
+    async def stop(self):
+        for mint in list(self.pools):
+            await self._drop(mint)
+
+    def stats(self):
+        return {"pools": len(self.pools), "prices": len(self.prices), "unpriced": len(self.unpriced)}
+
+
+pool_prices = PoolPriceEngine()
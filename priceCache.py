@@ -0,0 +1,84 @@
+import asyncio
+import time
+
+import constant
+from httpSession import get_http_client
+
+
+class PriceCache():
+    def __init__(
+        self,
+        url=constant.raydiumPriceURL,
+        ttl=constant.priceCacheTTL,
+        refresh_interval=constant.priceRefreshInterval,
+    ):
+        """Process-wide cache of the Raydium mint -> USD price map."""
+        super().__init__()
+        self.url = url
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self.prices = {}
+        self.updated_at = 0.0
+        self._inflight = None
+        self._refresher = None
+
+    def is_stale(self):
+        return time.monotonic() - self.updated_at > self.ttl
+
+    async def _fetch(self):
+        response = await get_http_client().get(self.url)
+        response.raise_for_status()  # Check for HTTP errors
+        self.prices = response.json()
+        self.updated_at = time.monotonic()
+        return self.prices
+
+    async def refresh(self):
+        # single-flight: every caller arriving while a download is running awaits that same download
+        if self._inflight is None:
+            self._inflight = asyncio.create_task(self._fetch())
+        task = self._inflight
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if self._inflight is task and task.done():
+                self._inflight = None
+
+    async def get_prices(self):
+        if self.is_stale():
+            try:
+                await self.refresh()
+            except Exception as e:
+                if not self.prices:
+                    raise
+                print(f'Error refreshing prices, serving cached map: {e}')
+        return self.prices
+
+    async def get_price(self, mint, default=None):
+        prices = await self.get_prices()
+        return prices.get(mint, default)
+
+    def start(self):
+        if self._refresher is None or self._refresher.done():
+            self._refresher = asyncio.create_task(self._run_refresher())
+
+    async def _run_refresher(self):
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f'Error refreshing prices: {e}')
+            await asyncio.sleep(self.refresh_interval)
+
+    async def stop(self):
+        if self._refresher is not None:
+            self._refresher.cancel()
+            try:
+                await self._refresher
+            except asyncio.CancelledError:
+                pass
+            self._refresher = None
+
+
+price_cache = PriceCache()
@@ -0,0 +1,146 @@
+import asyncio
+import base64
+import time
+from collections import OrderedDict
+
+from solders.transaction import Transaction, VersionedTransaction
+
+import constant
+from rpcBatcher import rpc_batcher
+
+GLOBAL = "*"  # fees of the whole cluster, used until a swap's own accounts have been sampled
+LAMPORTS_PER_SOL = 1000000000
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p / 100))]
+
+
+def writable_accounts(serialized_transaction: bytes, limit=constant.priorityFeeMaxAccounts):
+    """Static accounts a transaction write-locks, minus the fee payer; these are what compete for block space."""
+    try:
+        message = VersionedTransaction.from_bytes(serialized_transaction).message
+        is_writable = message.is_maybe_writable
+    except Exception:
+        message = Transaction.from_bytes(serialized_transaction).message
+        is_writable = message.is_writable
+    keys = message.account_keys
+    return [str(keys[i]) for i in range(1, len(keys)) if is_writable(i)][:limit]
+
+
+class PriorityFeeEstimator():
+    def __init__(
+        self,
+        refresh_interval=constant.priorityFeeRefreshInterval,
+        windows=constant.priorityFeeWindows,
+        presets=constant.priorityFeePresets,
+        max_watched=constant.priorityFeeMaxWatched,
+        watch_ttl=constant.priorityFeeWatchTTL,
+    ):
+        """Percentiles of getRecentPrioritizationFees, sampled in the background per set of swap accounts."""
+        super().__init__()
+        self.refresh_interval = refresh_interval
+        self.windows = windows  # slot counts, newest slots first
+        self.presets = presets  # name -> (window, percentile)
+        self.max_watched = max_watched
+        self.watch_ttl = watch_ttl
+        self.watched = OrderedDict()  # key (output mint) -> {"accounts", "used_at"}, least recently used first
+        self.tables = {}  # key -> {"slot", "updated_at", window: {percentile: micro-lamports per CU}}
+        self._refresher = None
+
+    def watch(self, key, accounts):
+        """Sample fees for the accounts a swap on `key` touches, from the next refresh on."""
+        if not accounts:
+            return
+        self.watched[key] = {"accounts": accounts, "used_at": time.monotonic()}
+        self.watched.move_to_end(key)
+        while len(self.watched) > self.max_watched:
+            stale, _ = self.watched.popitem(last=False)
+            self.tables.pop(stale, None)
+
+    def _expire(self):
+        # a mint nobody traded for a while is not worth a request every interval
+        now = time.monotonic()
+        while self.watched and now - next(iter(self.watched.values()))["used_at"] > self.watch_ttl:
+            stale, _ = self.watched.popitem(last=False)
+            self.tables.pop(stale, None)
+
+    def _table(self, samples):
+        newest_first = sorted(samples, key=lambda sample: sample["slot"], reverse=True)
+        percentiles = {p for window, p in self.presets.values()}
+        table = {"slot": newest_first[0]["slot"] if newest_first else None, "updated_at": time.monotonic()}
+        for window in self.windows:
+            fees = sorted(sample["prioritizationFee"] for sample in newest_first[:window])
+            table[window] = {p: percentile(fees, p) for p in percentiles}
+        return table
+
+    async def refresh(self, key=GLOBAL):
+        accounts = self.watched[key]["accounts"] if key in self.watched else []
+        samples = await rpc_batcher.call_raw("getRecentPrioritizationFees", [accounts])
+        self.tables[key] = self._table(samples)
+        return self.tables[key]
+
+    async def refresh_all(self):
+        self._expire()
+        # issued together, the batcher sends them as one JSON-RPC array
+        keys = [GLOBAL] + list(self.watched)
+        results = await asyncio.gather(*(self.refresh(key) for key in keys), return_exceptions=True)
+        for key, result in zip(keys, results):
+            if isinstance(result, Exception):
+                print(f'Error sampling priority fees for {key}: {result}')
+
+    def micro_lamports(self, preset=constant.priorityFeePreset, key=GLOBAL):
+        """Compute-unit price for `preset`, from memory; falls back to the cluster-wide table."""
+        if key in self.watched:
+            self.watched.move_to_end(key)
+            self.watched[key]["used_at"] = time.monotonic()
+        table = self.tables.get(key) or self.tables.get(GLOBAL)
+        if table is None:
+            return None
+        window, p = self.presets[preset]
+        ceiling = constant.priorityFeeMaxSol * LAMPORTS_PER_SOL * 1000000 // constant.priorityFeeComputeUnits
+        return int(min(max(table[window][p], constant.priorityFeeMinMicroLamports), ceiling))
+
+    def fee_sol(self, preset=constant.priorityFeePreset, key=GLOBAL, compute_units=constant.priorityFeeComputeUnits):
+        """Total priority fee in SOL for a transaction requesting `compute_units`, what Solana Tracker expects."""
+        price = self.micro_lamports(preset, key)
+        if price is None:
+            return constant.priorityFeeDefaultSol
+        fee = price * compute_units / 1000000 / LAMPORTS_PER_SOL
+        return min(fee, constant.priorityFeeMaxSol)
+
+    def start(self):
+        if self._refresher is None or self._refresher.done():
+            self._refresher = asyncio.create_task(self._run_refresher())
+
+    async def _run_refresher(self):
+        while True:
+            try:
+                await self.refresh_all()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f'Error sampling priority fees: {e}')
+            await asyncio.sleep(self.refresh_interval)
+
+    async def stop(self):
+        if self._refresher is not None:
+            self._refresher.cancel()
+            try:
+                await self._refresher
+            except asyncio.CancelledError:
+                pass
+            self._refresher = None
+
+
+priority_fees = PriorityFeeEstimator()
+
+
+def watch_swap_accounts(key, swap_response):
+    """Register the writable accounts of a Solana Tracker swap transaction under `key`."""
+    try:
+        priority_fees.watch(key, writable_accounts(base64.b64decode(swap_response["txn"])))
+    except Exception as e:
+        print(f'Error reading swap accounts: {e}')
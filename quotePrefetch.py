@@ -0,0 +1,68 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+import constant
+
+
+class QuotePrefetcher():
+    def __init__(
+        self,
+        ttl=constant.quotePrefetchTTL,
+        max_entries=constant.quotePrefetchSize,
+    ):
+        """Speculative swap quotes fetched while the user is still looking at the token card."""
+        super().__init__()
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (started_at, task)
+        self.hits = 0
+        self.misses = 0
+
+    def _is_fresh(self, entry):
+        return time.monotonic() - entry[0] <= self.ttl
+
+    @staticmethod
+    def _consume(task):
+        # nobody may ever take this quote, keep its failure from being reported as unretrieved
+        if not task.cancelled():
+            task.exception()
+
+    def prefetch(self, key, fetch):
+        """Start `fetch()` (a coroutine function) in the background unless a fresh quote for `key` exists."""
+        entry = self._entries.get(key)
+        if entry is not None and self._is_fresh(entry):
+            return
+        task = asyncio.create_task(fetch())
+        task.add_done_callback(self._consume)
+        self._entries[key] = (time.monotonic(), task)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            _, (_, oldest) = self._entries.popitem(last=False)
+            oldest.cancel()
+
+    async def take(self, key):
+        """The prefetched quote for `key`, waiting for it if still in flight; None when there is no usable one.
+
+        A quote is handed out once, the next trade with the same key fetches a new one.
+        """
+        entry = self._entries.pop(key, None)
+        if entry is None or not self._is_fresh(entry):
+            if entry is not None:
+                entry[1].cancel()
+            self.misses += 1
+            return None
+        try:
+            result = await entry[1]
+        except Exception as e:
+            print(f'Error prefetching quote: {e}')
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    def stats(self):
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+quote_prefetcher = QuotePrefetcher()
@@ -0,0 +1,174 @@
+import asyncio
+import itertools
+import json
+from solana.rpc.core import RPCException, _ClientCore
+from solders.rpc.responses import (
+    GetBalanceResp,
+    GetSignatureStatusesResp,
+    GetTokenAccountsByOwnerJsonParsedResp,
+    batch_from_json,
+)
+
+import constant
+from rpcRouter import rpc_router
+
+
+class RpcBatcher():
+    def __init__(
+        self,
+        router=rpc_router,
+        window=constant.rpcBatchWindow,
+        max_batch=constant.rpcMaxBatchSize,
+        max_signatures=constant.rpcMaxSignaturesPerCall,
+    ):
+        """Collect RPC calls issued within `window` seconds and send them as one JSON-RPC batch."""
+        super().__init__()
+        self.router = router
+        self.window = window
+        self.max_batch = max_batch
+        self.max_signatures = max_signatures
+        self._bodies = _ClientCore()  # builds request bodies with the same defaults as AsyncClient
+        self._pending = []  # (body, parser, future)
+        self._pending_signatures = []  # (signatures, future)
+        self._flush_handle = None
+        self._sends = set()  # batches in flight, referenced until they finish
+        self._ids = itertools.count(1)
+
+    def _schedule(self):
+        if len(self._pending) + len(self._pending_signatures) >= self.max_batch:
+            self._flush_now()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.window, self._flush_now)
+
+    def _flush_now(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, []
+        signature_waiters, self._pending_signatures = self._pending_signatures, []
+        if pending or signature_waiters:
+            task = asyncio.create_task(self._send(pending, signature_waiters))
+            self._sends.add(task)
+            task.add_done_callback(self._sends.discard)
+
+    async def _enqueue(self, body, parser):
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((body, parser, future))
+        self._schedule()
+        return await future
+
+    async def _send(self, pending, signature_waiters):
+        # every distinct signature of the window, across users, goes into as few getSignatureStatuses as possible
+        signatures = list(dict.fromkeys(sig for sigs, _ in signature_waiters for sig in sigs))
+        chunks = [signatures[i:i + self.max_signatures] for i in range(0, len(signatures), self.max_signatures)]
+        requests = [(body, parser) for body, parser, _ in pending] + [
+            (self._bodies._get_signature_statuses_body(chunk, False), GetSignatureStatusesResp)
+            for chunk in chunks
+        ]
+        futures = [future for _, future in signature_waiters] + [future for _, _, future in pending]
+        error = None
+        try:
+            results = []
+            for i in range(0, len(requests), self.max_batch):
+                results += await self._send_batch(requests[i:i + self.max_batch])
+            error = self._resolve(pending, signature_waiters, chunks, results)
+        except asyncio.CancelledError as e:
+            error = e
+            raise
+        except Exception as e:
+            # handed to every caller below
+            error = e
+        finally:
+            # nothing may be left waiting, whatever went wrong above
+            for future in futures:
+                if not future.done():
+                    if isinstance(error, asyncio.CancelledError):
+                        future.cancel()
+                    else:
+                        future.set_exception(error or RPCException("missing response in JSON-RPC batch"))
+
+    @staticmethod
+    def _resolve(pending, signature_waiters, chunks, results):
+        for (_, _, future), result in zip(pending, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+        statuses = {}
+        context = None
+        error = None
+        for chunk, result in zip(chunks, results[len(pending):]):
+            if isinstance(result, Exception):
+                error = result
+                continue
+            context = result.context
+            statuses.update(zip(chunk, result.value))
+        for sigs, future in signature_waiters:
+            if not future.done() and all(sig in statuses for sig in sigs):
+                future.set_result(GetSignatureStatusesResp([statuses[sig] for sig in sigs], context))
+        return error
+
+    def _with_id(self, body):
+        # solana-py builds every body with id 0, the responses are matched back by id
+        payload = dict(body) if isinstance(body, dict) else json.loads(body.to_json())
+        payload["jsonrpc"] = "2.0"
+        payload["id"] = next(self._ids)
+        return payload
+
+    @staticmethod
+    async def _post(client, payloads):
+        provider = client._provider
+        response = await provider.session.post(provider.endpoint_uri, json=payloads)
+        response.raise_for_status()
+        return response.json()
+
+    async def _send_batch(self, requests):
+        payloads = [self._with_id(body) for body, _ in requests]
+        items = await self.router.run(lambda client: self._post(client, payloads), "batch")
+        if not isinstance(items, list):
+            # the whole batch was rejected
+            raise RPCException(items.get("error", items) if isinstance(items, dict) else items)
+        # a node may answer a batch in any order
+        by_id = {item.get("id"): item for item in items}
+        ordered = [
+            by_id.get(payload["id"], {"jsonrpc": "2.0", "id": payload["id"], "error": {"code": -32603, "message": "missing response"}})
+            for payload in payloads
+        ]
+        results = [
+            # methods solders has no types for hand back the decoded result
+            RPCException(item["error"]) if "error" in item else item.get("result")
+            for item in ordered
+        ]
+        typed = [i for i, (_, parser) in enumerate(requests) if parser is not None]
+        if typed:
+            parsed = batch_from_json(json.dumps([ordered[i] for i in typed]), [requests[i][1] for i in typed])
+            for i, result in zip(typed, parsed):
+                # any error variant (-32603, invalid params, ...) parses into something without a context
+                results[i] = result if hasattr(result, "context") and hasattr(result, "value") else RPCException(result)
+        return results
+
+    async def get_balance(self, pubkey, commitment=None) -> GetBalanceResp:
+        return await self._enqueue(self._bodies._get_balance_body(pubkey, commitment), GetBalanceResp)
+
+    async def get_token_accounts_by_owner_json_parsed(self, owner, opts, commitment=None) -> GetTokenAccountsByOwnerJsonParsedResp:
+        body = self._bodies._get_token_accounts_by_owner_json_parsed_body(owner, opts, commitment)
+        return await self._enqueue(body, GetTokenAccountsByOwnerJsonParsedResp)
+
+    async def call_raw(self, method, params=None):
+        """JSON-RPC methods solders has no request type for, sent in the same batch; returns the decoded `result`."""
+        return await self._enqueue({"method": method, "params": params or []}, None)
+
+    async def get_signature_statuses(self, signatures, search_transaction_history=False) -> GetSignatureStatusesResp:
+        if search_transaction_history:
+            # history lookups are rare and cannot share a call with the plain status checks
+            return await self.router.call("get_signature_statuses", signatures, search_transaction_history)
+        future = asyncio.get_running_loop().create_future()
+        self._pending_signatures.append((list(signatures), future))
+        self._schedule()
+        return await future
+
+
+rpc_batcher = RpcBatcher()
@@ -0,0 +1,228 @@
+import asyncio
+import time
+import httpx
+from solana.rpc.async_api import AsyncClient
+from solana.rpc.core import RPCException
+
+import constant
+
+_async_clients = {}
+_replaced_sessions = []  # solana-py's own sessions, closed with the clients
+
+
+def get_async_client(url=constant.clientURL) -> AsyncClient:
+    # one long-lived AsyncClient per endpoint so every caller shares the same keep-alive pool
+    client = _async_clients.get(url)
+    if client is None:
+        client = AsyncClient(url, timeout=constant.rpcTimeout)
+        _use_pooled_session(client, url)
+        _async_clients[url] = client
+    return client
+
+
+def _use_pooled_session(client, url):
+    # solana-py (0.34) takes no session or pool limits, the only way in is its provider's session attribute
+    provider = getattr(client, "_provider", None)
+    if not isinstance(getattr(provider, "session", None), httpx.AsyncClient):
+        print(f'Cannot size the rpc connection pool for {url}, using the solana-py default')
+        return
+    _replaced_sessions.append(provider.session)
+    provider.session = httpx.AsyncClient(
+        timeout=httpx.Timeout(constant.rpcTimeout, connect=constant.rpcConnectTimeout),
+        limits=httpx.Limits(
+            max_connections=constant.rpcPoolSize,
+            max_keepalive_connections=constant.rpcPoolSize,
+            keepalive_expiry=constant.rpcKeepaliveExpiry,
+        ),
+    )
+
+
+async def close_async_clients():
+    while _async_clients:
+        url, client = _async_clients.popitem()
+        try:
+            await client.close()
+        except Exception as e:
+            print(f'Error closing rpc client {url}: {e}')
+    while _replaced_sessions:
+        await _replaced_sessions.pop().aclose()
+
+
+class RpcEndpoint():
+    def __init__(self, url, weight=1):
+        """Latency/error bookkeeping for one RPC node."""
+        super().__init__()
+        self.url = url
+        self.weight = weight
+        self.latency = 0.0  # EWMA seconds, 0 until measured so new nodes get tried first
+        self.error_rate = 0.0  # EWMA of failures, 0..1
+        self.ejected_until = 0.0
+
+    @property
+    def client(self) -> AsyncClient:
+        return get_async_client(self.url)
+
+    def is_ejected(self):
+        return self.ejected_until > 0
+
+    def score(self):
+        # lower is better: slow or flaky nodes are penalized, weight scales preference
+        return self.latency * (1 + 4 * self.error_rate) / self.weight
+
+    def record(self, elapsed, ok, alpha=constant.rpcEwmaAlpha):
+        if not ok:
+            # a failed call costs the caller a retry elsewhere, count it as a full timeout
+            elapsed = max(elapsed, constant.rpcTimeout)
+        self.latency = elapsed if self.latency == 0.0 else alpha * elapsed + (1 - alpha) * self.latency
+        self.error_rate = alpha * (0.0 if ok else 1.0) + (1 - alpha) * self.error_rate
+
+    def __repr__(self):
+        state = "ejected" if self.is_ejected() else "up"
+        return f"RpcEndpoint({self.url}, {state}, latency={self.latency * 1000:.0f}ms, errors={self.error_rate:.2f})"
+
+
+class RoutedClient():
+    def __init__(self, router):
+        """AsyncClient look-alike that sends every RPC method through the router."""
+        super().__init__()
+        self._router = router
+
+    def __getattr__(self, name):
+        attr = getattr(AsyncClient, name, None)
+        if attr is None or not asyncio.iscoroutinefunction(attr) or name in ("close", "__aenter__", "__aexit__"):
+            # plain attributes and lifecycle methods belong to the current best node
+            return getattr(self._router.pick().client, name)
+
+        async def routed(*args, **kwargs):
+            return await self._router.call(name, *args, **kwargs)
+        return routed
+
+
+class RpcRouter():
+    def __init__(
+        self,
+        endpoints=constant.rpcEndpoints,
+        eject_error_rate=constant.rpcEjectErrorRate,
+        eject_seconds=constant.rpcEjectSeconds,
+        probe_interval=constant.rpcProbeInterval,
+    ):
+        """Route RPC calls to the healthiest endpoint, eject failing ones and re-probe them."""
+        super().__init__()
+        self.endpoints = [RpcEndpoint(e["url"], e.get("weight", 1)) for e in endpoints]
+        self.eject_error_rate = eject_error_rate
+        self.eject_seconds = eject_seconds
+        self.probe_interval = probe_interval
+        self.client = RoutedClient(self)
+        self._prober = None
+
+    def healthy(self):
+        live = [e for e in self.endpoints if not e.is_ejected()]
+        return sorted(live, key=lambda e: e.score())
+
+    def pick(self) -> RpcEndpoint:
+        live = self.healthy()
+        if live:
+            return live[0]
+        # everything is ejected: fall back to the one whose ejection started first
+        return min(self.endpoints, key=lambda e: e.ejected_until)
+
+    def _eject(self, endpoint):
+        if not endpoint.is_ejected():
+            print(f'Ejecting rpc endpoint {endpoint}')
+        endpoint.ejected_until = time.monotonic() + self.eject_seconds
+
+    async def call(self, method, *args, **kwargs):
+        return await self.run(lambda client: getattr(client, method)(*args, **kwargs), method)
+
+    async def call_raw(self, method, params=None):
+        """JSON-RPC methods solana-py has no wrapper for; returns the decoded `result`."""
+        async def request(client):
+            provider = client._provider
+            response = await provider.session.post(
+                provider.endpoint_uri,
+                json={"jsonrpc": "2.0", "id": 1, "method": method, "params": params or []},
+            )
+            response.raise_for_status()
+            body = response.json()
+            if "error" in body:
+                raise RPCException(body["error"])
+            return body["result"]
+
+        return await self.run(request, method)
+
+    async def run(self, request, label="request"):
+        # request(client) -> awaitable, retried on the next healthiest node on transport errors
+        candidates = self.healthy() or [self.pick()]
+        last_error = None
+        for endpoint in candidates:
+            start = time.monotonic()
+            try:
+                result = await request(endpoint.client)
+            except RPCException:
+                # the node answered, the request itself was rejected; another node will say the same
+                endpoint.record(time.monotonic() - start, True)
+                raise
+            except Exception as e:
+                endpoint.record(time.monotonic() - start, False)
+                if endpoint.error_rate >= self.eject_error_rate:
+                    self._eject(endpoint)
+                print(f'rpc {label} failed on {endpoint.url}: {e}')
+                last_error = e
+                continue
+            endpoint.record(time.monotonic() - start, True)
+            return result
+        raise last_error
+
+    async def get_balance(self, *args, **kwargs):
+        return await self.call("get_balance", *args, **kwargs)
+
+    async def get_token_accounts_by_owner_json_parsed(self, *args, **kwargs):
+        return await self.call("get_token_accounts_by_owner_json_parsed", *args, **kwargs)
+
+    async def get_signature_statuses(self, *args, **kwargs):
+        return await self.call("get_signature_statuses", *args, **kwargs)
+
+    async def probe(self, endpoint):
+        start = time.monotonic()
+        try:
+            await endpoint.client.get_slot()
+        except Exception as e:
+            endpoint.record(time.monotonic() - start, False)
+            if endpoint.is_ejected():
+                endpoint.ejected_until = time.monotonic() + self.eject_seconds
+            elif endpoint.error_rate >= self.eject_error_rate:
+                self._eject(endpoint)
+            return False
+        endpoint.record(time.monotonic() - start, True)
+        if endpoint.is_ejected() and time.monotonic() >= endpoint.ejected_until:
+            # readmit with half the eject threshold so a single new failure does not bounce it straight out
+            endpoint.ejected_until = 0.0
+            endpoint.error_rate = min(endpoint.error_rate, self.eject_error_rate / 2)
+            print(f'Readmitting rpc endpoint {endpoint}')
+        return True
+
+    def start(self):
+        if self._prober is None or self._prober.done():
+            self._prober = asyncio.create_task(self._run_prober())
+
+    async def _run_prober(self):
+        while True:
+            try:
+                await asyncio.gather(*(self.probe(e) for e in self.endpoints))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f'Error probing rpc endpoints: {e}')
+            await asyncio.sleep(self.probe_interval)
+
+    async def stop(self):
+        if self._prober is not None:
+            self._prober.cancel()
+            try:
+                await self._prober
+            except asyncio.CancelledError:
+                pass
+            self._prober = None
+
+
+rpc_router = RpcRouter()
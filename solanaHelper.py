@@ -5,13 +5,22 @@ from solders.keypair import Keypair
 from solders.system_program import TransferParams, transfer
 from solders.signature import Signature
 from solana.rpc.api import Client
+from solana.rpc.async_api import AsyncClient
 from solana.transaction import Transaction
 import constant
 from solana.rpc import types
 from spl.token.constants import TOKEN_PROGRAM_ID
 
-from solana.rpc.types import MemcmpOpts
+from solana.rpc.types import MemcmpOpts, TxOpts
 from typing import List, Union
+from rpcRouter import rpc_router, get_async_client, close_async_clients
+from rpcBatcher import rpc_batcher
+from txRebroadcast import rebroadcaster
+from blockhashCache import blockhash_cache
+from solders.transaction import Transaction as SoldersTransaction
+from solders.message import Message
+from solders.compute_budget import set_compute_unit_limit
+from cuProfiler import cu_profiler, route_key
 
 class SolanaHelper():
     def __init__(
@@ -81,6 +90,73 @@ class SolanaHelper():
 
 
 
+class AsyncSolanaHelper():
+    def __init__(
+        self,
+        url=None,
+    ):
+        """Init async API client, routed across constant.rpcEndpoints unless pinned to a url."""
+        super().__init__()
+        self.client = get_async_client(url) if url else rpc_router.client
+
+    async def transactionFun(self, sender: Keypair, receiver: Pubkey, amount):
+        print('sender',sender)
+        print('receiver',receiver)
+        print('amount',amount)
+        try:
+            ix = transfer(
+                TransferParams(
+                    from_pubkey=sender.pubkey(), to_pubkey=receiver, lamports=int(amount)
+                )
+            )
+            route = route_key(Message([ix], sender.pubkey()))
+            # without a profile yet, this transfer goes out as before and one shaped like the
+            # profiled ones (limit instruction included) is simulated
+            probe = Message([set_compute_unit_limit(constant.cuMaxLimit), ix], sender.pubkey())
+            cu_profiler.observe(route, SoldersTransaction.new_unsigned(probe))
+            limit = cu_profiler.limit(route)
+            ixs = [set_compute_unit_limit(limit), ix] if limit else [ix]
+            blockhash = await blockhash_cache.get()
+            txn = SoldersTransaction.new_signed_with_payer(ixs, sender.pubkey(), [sender], blockhash.blockhash)
+            raw_txn = bytes(txn)
+            txnRes = await rebroadcaster.send(raw_txn, TxOpts(skip_preflight=False))
+            # keep resending in the background until it lands or the blockhash expires
+            rebroadcaster.track(raw_txn, txnRes, blockhash.last_valid_block_height)
+            return txnRes
+        except Exception as e:
+            print(f'Error sending SOL: {e}')
+        return None
+
+    async def check_transaction_status(self, transaction_id: str):
+        print('transaction_id',transaction_id)
+        try:
+            response = await rpc_batcher.get_signature_statuses([Signature.from_string(transaction_id)])
+            status = response.value[0]
+            if status is not None:
+                print(f"Transaction status: {status}")
+                return status
+            else:
+                print(f"Transaction status not found")
+                return None
+        except Exception as e:
+            print(f'Error getting txn status: {e}')
+        return None
+
+    async def getAccountInfo(self, pubKey):
+        try:
+            tmpOpts = types.TokenAccountOpts(program_id=TOKEN_PROGRAM_ID)
+            return await rpc_batcher.get_token_accounts_by_owner_json_parsed(pubKey, tmpOpts)
+        except Exception as e:
+            print(f'Error getting account info: {e}')
+        return None
+
+    async def getLatestBlockHash(self):
+        return await self.client.get_latest_blockhash()
+
+    async def getBalance(self, pubkey):
+        return await rpc_batcher.get_balance(pubkey)
+
+
 # pubkeyfromStr1 = Pubkey.from_string("str") 
 # helper = SolanaHelper()
 # info = helper.getAccountInfo(pubkeyfromStr1)
\ No newline at end of file
@@ -0,0 +1,152 @@
+import asyncio
+import itertools
+import json
+import websockets
+from solders.rpc.responses import SubscriptionError, SubscriptionResult, parse_websocket_message
+
+import constant
+
+
+class SolanaWsHub():
+    def __init__(self, url=constant.wsURL):
+        """One shared Solana pubsub websocket multiplexing every subscription of the process."""
+        super().__init__()
+        self.url = url
+        self.connected = asyncio.Event()
+        self.connections = 0  # bumped on every (re)connect, notifications may have been missed in between
+        self._ws = None
+        self._runner = None
+        self._request_ids = itertools.count(1)
+        self._handles = itertools.count(1)
+        self._subscriptions = {}  # handle -> (make_body, make_unsubscribe_body, callback)
+        self._server_ids = {}  # handle -> subscription id on the current connection
+        self._handle_by_server_id = {}
+        self._pending = {}  # request id -> (handle, future)
+
+    async def subscribe(self, make_body, make_unsubscribe_body, callback):
+        # make_body(request_id) -> solders subscribe body, callback(notification) runs on the reader task
+        handle = next(self._handles)
+        self._subscriptions[handle] = (make_body, make_unsubscribe_body, callback)
+        # also while _run is re-subscribing after a reconnect: this handle is not in its snapshot
+        if self._ws is not None:
+            try:
+                await self._send_subscribe(handle)
+            except Exception:
+                self._subscriptions.pop(handle, None)
+                raise
+        return handle
+
+    async def unsubscribe(self, handle):
+        entry = self._subscriptions.pop(handle, None)
+        server_id = self._server_ids.pop(handle, None)
+        if server_id is not None:
+            self._handle_by_server_id.pop(server_id, None)
+        if entry is None or server_id is None or self._ws is None:
+            return
+        try:
+            await self._ws.send(entry[1](server_id, next(self._request_ids)).to_json())
+        except Exception as e:
+            print(f'Error unsubscribing {handle}: {e}')
+
+    def is_active(self, handle):
+        """The server acknowledged `handle` on the current connection, so its notifications are flowing."""
+        return self.connected.is_set() and handle in self._server_ids
+
+    def forget(self, handle):
+        # for one-shot feeds (signatureSubscribe) the server already dropped the subscription
+        self._subscriptions.pop(handle, None)
+        server_id = self._server_ids.pop(handle, None)
+        self._handle_by_server_id.pop(server_id, None)
+
+    async def _send_subscribe(self, handle):
+        request_id = next(self._request_ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = (handle, future)
+        await self._ws.send(self._subscriptions[handle][0](request_id).to_json())
+        return await future
+
+    def _dispatch(self, raw):
+        try:
+            messages = parse_websocket_message(raw)
+        except Exception:
+            # unsubscribe acks ({"result": true}) are not understood by solders, nothing to do with them
+            payload = json.loads(raw)
+            if "error" in payload and payload.get("id") in self._pending:
+                _, future = self._pending.pop(payload["id"])
+                future.set_exception(Exception(payload["error"]))
+            return
+        for message in messages:
+            if isinstance(message, SubscriptionResult):
+                handle, future = self._pending.pop(message.id, (None, None))
+                if handle in self._subscriptions:
+                    self._server_ids[handle] = message.result
+                    self._handle_by_server_id[message.result] = handle
+                if future is not None and not future.done():
+                    future.set_result(message.result)
+            elif isinstance(message, SubscriptionError):
+                _, future = self._pending.pop(message.id, (None, None))
+                if future is not None and not future.done():
+                    future.set_exception(Exception(message.error.message))
+            else:
+                handle = self._handle_by_server_id.get(message.subscription)
+                entry = self._subscriptions.get(handle)
+                if entry is None:
+                    continue
+                try:
+                    entry[2](message)
+                except Exception as e:
+                    print(f'Error in websocket callback: {e}')
+
+    async def _run(self):
+        delay = constant.wsReconnectDelay
+        while True:
+            try:
+                async with websockets.connect(self.url, ping_interval=constant.wsPingInterval, max_size=None) as ws:
+                    self._ws = ws
+                    self._server_ids.clear()
+                    self._handle_by_server_id.clear()
+                    reader = asyncio.create_task(self._read(ws))
+                    try:
+                        # re-establish everything that was subscribed before the (re)connect
+                        await asyncio.gather(*(self._send_subscribe(h) for h in list(self._subscriptions)), return_exceptions=True)
+                        self.connections += 1
+                        self.connected.set()
+                        delay = constant.wsReconnectDelay
+                        await reader
+                    finally:
+                        reader.cancel()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f'Solana websocket disconnected: {e}')
+            finally:
+                self.connected.clear()
+                self._ws = None
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, constant.wsMaxReconnectDelay)
+
+    async def _read(self, ws):
+        try:
+            async for raw in ws:
+                self._dispatch(raw)
+        finally:
+            for _, future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("websocket closed"))
+            self._pending.clear()
+
+    def start(self):
+        if self._runner is None or self._runner.done():
+            self._runner = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._runner is not None:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
+            self._runner = None
+
+
+ws_hub = SolanaWsHub()
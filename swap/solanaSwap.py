@@ -1,7 +1,11 @@
+import base64
 from solders.keypair import Keypair
-from swap.solanatracker import SolanaTracker
-import asyncio
-import time
+from solders.transaction import Transaction
+from swap.solanatracker import solana_tracker
+from quotePrefetch import quote_prefetcher
+from priorityFee import priority_fees, watch_swap_accounts
+from cuProfiler import cu_profiler, route_key
+import constant
 
 class SolanaSwapModule():
     def __init__(
@@ -13,31 +17,8 @@ class SolanaSwapModule():
         super().__init__()
         self.solana_rpc_url = url
         self.input_mint = input_mint
-
-
-    def initializeTracker(self, keypair):
-        self.solana_tracker = SolanaTracker(keypair, self.solana_rpc_url)
-        return self.solana_tracker
-    
-    async def execute_swap(self, output_mint: str, amount, slippage_bps: int, sender: Keypair):
-
-        start_time = time.time()
-
-        
-        self.solana_tracker = SolanaTracker(sender, self.solana_rpc_url)
-        
-        swap_response = await self.solana_tracker.get_swap_instructions(
-            self.input_mint,
-            output_mint,
-            amount,
-            slippage_bps,  # Slippage
-            str(sender.pubkey()),  # Payer public key
-            0.00005,  # Priority fee (Recommended while network is congested)
-        )
-
-        
-        # Define custom options
-        custom_options = {
+        self.solana_tracker = solana_tracker
+        self.swap_options = {
             "send_options": {"skip_preflight": True, "max_retries": 5},
             "confirmation_retries": 50,
             "confirmation_retry_timeout": 1000,
@@ -47,22 +28,62 @@ class SolanaSwapModule():
             "confirmation_check_interval": 100,
             "skip_confirmation_check": False,
         }
-        
+
+    def quote_key(self, output_mint: str, amount, slippage_bps: int, payer: str):
+        return (self.input_mint, output_mint, float(amount), slippage_bps, payer)
+
+    async def get_swap_instructions(self, output_mint: str, amount, slippage_bps: int, payer: str):
+        return await self.solana_tracker.get_swap_instructions(
+            self.input_mint,
+            output_mint,
+            amount,
+            slippage_bps,  # Slippage
+            payer,  # Payer public key
+            # sampled in the background, no round trip here
+            priority_fees.fee_sol(constant.priorityFeePreset, key=output_mint),
+        )
+
+    def prefetch_quotes(self, output_mint: str, amounts, slippage_bps: int, payer: str):
+        # the unsigned swap transaction is signed with a fresh blockhash in perform_swap,
+        # so a quote fetched a few seconds before the tap is still sendable
+        for amount in amounts:
+            quote_prefetcher.prefetch(
+                self.quote_key(output_mint, amount, slippage_bps, payer),
+                lambda amount=amount: self.get_swap_instructions(output_mint, amount, slippage_bps, payer),
+            )
+
+    async def quote(self, output_mint: str, amount, slippage_bps: int, payer: str):
+        swap_response = await quote_prefetcher.take(self.quote_key(output_mint, amount, slippage_bps, payer))
+        if not swap_response or "txn" not in swap_response:
+            swap_response = await self.get_swap_instructions(output_mint, amount, slippage_bps, payer)
+        if swap_response and "txn" in swap_response:
+            swap_response["outputMint"] = output_mint
+            if output_mint not in priority_fees.watched:
+                # later trades of this mint are priced on the accounts this swap write-locks
+                watch_swap_accounts(output_mint, swap_response)
+            try:
+                txn = Transaction.from_bytes(base64.b64decode(swap_response["txn"]))
+                cu_profiler.observe(route_key(txn.message, output_mint), txn)
+            except Exception as e:
+                print(f'Error reading swap transaction: {e}')
+        return swap_response
+
+    async def perform(self, swap_response, sender: Keypair):
         try:
-            send_time = time.time()
-            # return "id>>>"
-            txid = await self.solana_tracker.perform_swap(swap_response, options=custom_options)
-            end_time = time.time()
-            elapsed_time = end_time - start_time
-            
+            txid = await self.solana_tracker.perform_swap(swap_response, sender, options=self.swap_options)
+            # perform_swap hands errors back instead of raising them
+            if isinstance(txid, Exception):
+                raise txid
+            # an on-chain error comes back as the error object instead of the signature
+            if not isinstance(txid, str):
+                raise Exception(str(txid))
             print("Transaction URL:", f"https://solscan.io/tx/{txid}")
-            # print(f"Swap completed in {elapsed_time:.2f} seconds")
-            # print(f"Transaction finished in {end_time - send_time:.2f} seconds")
             return txid
         except Exception as e:
-            end_time = time.time()
-            elapsed_time = end_time - start_time
             print("Swap failed:", str(e))
             return None
             # Add retries or additional error handling as needed
 
+    async def execute_swap(self, output_mint: str, amount, slippage_bps: int, sender: Keypair):
+        swap_response = await self.quote(output_mint, amount, slippage_bps, str(sender.pubkey()))
+        return await self.perform(swap_response, sender)
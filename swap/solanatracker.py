@@ -1,5 +1,4 @@
 import base64
-import aiohttp
 import asyncio
 from solders.keypair import Keypair
 from solders.rpc.responses import SendTransactionResp, GetSignatureStatusesResp, GetBlockHeightResp
@@ -7,17 +6,30 @@ from solders.transaction import Transaction
 from solana.rpc.async_api import AsyncClient
 from solana.rpc.commitment import Confirmed, Finalized, Processed
 from solana.rpc.types import TxOpts
+from rpcRouter import rpc_router
+from txConfirmation import confirmation_engine
+from txRebroadcast import rebroadcaster
+from blockhashCache import blockhash_cache
+from cuProfiler import cu_profiler, route_key, with_compute_unit_limit
+from httpSession import get_http_client
+from solana.rpc.core import TransactionExpiredBlockheightExceededError
 from typing import Dict, Optional, Union
 
 class SolanaTracker:
-    def __init__(self, keypair: Keypair, rpc: str):
+    def __init__(self, connection=None, http=None):
+        # long-lived: one instance per process, the signer is passed to each perform_swap
         self.base_url = "https://swap-v2.solanatracker.io"
-        self.rpc = rpc
-        self.keypair = keypair
+        self.connection = connection or rpc_router.client
+        self._http = http
+
+    @property
+    def http(self):
+        return self._http or get_http_client()
 
     async def perform_swap(
         self,
         swap_response: Dict,
+        keypair: Keypair,
         options: Dict = {
             "send_options": {"skip_preflight": True},
             "confirmation_retries": 30,
@@ -40,26 +52,32 @@ class SolanaTracker:
         else:
             commitment = Confirmed
 
-        self.connection = AsyncClient(self.rpc, commitment=commitment)
-
         try:
             serialized_transaction = base64.b64decode(swap_response["txn"])
             txn = Transaction.from_bytes(serialized_transaction)
+
+            # request only the compute this route was measured to need
+            route = route_key(txn.message, swap_response.get("outputMint"))
+            limit = cu_profiler.limit(route)
+            if limit:
+                txn = with_compute_unit_limit(txn, limit)
             
-            blockhash_resp = await self.connection.get_latest_blockhash()
-            blockhash = blockhash_resp.value
-            txn.sign([self.keypair], blockhash.blockhash)
+            blockhash = await blockhash_cache.get()
+            txn.sign([keypair], blockhash.blockhash)
             
             blockhash_with_expiry = {
                 "blockhash": blockhash.blockhash,
                 "last_valid_block_height": blockhash.last_valid_block_height,
             }
 
-            return await self.transaction_sender_and_confirmation_waiter(
+            result = await self.transaction_sender_and_confirmation_waiter(
                 serialized_transaction=bytes(txn),
                 blockhash_with_expiry=blockhash_with_expiry,
                 options=options
             )
+            if limit and not isinstance(result, str) and "ComputationalBudgetExceeded" in str(result):
+                cu_profiler.invalidate(route)
+            return result
         except Exception as e:
             return Exception(str(e))
         
@@ -86,9 +104,8 @@ class SolanaTracker:
         url = f"{self.base_url}/swap"
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params) as response:
-                    data = await response.json()
+            response = await self.http.get(url, params=params)
+            data = response.json()
             data["forceLegacy"] = force_legacy
             return data
         except Exception as error:
@@ -112,51 +129,39 @@ class SolanaTracker:
 
         last_valid_block_height = blockhash_with_expiry["last_valid_block_height"] - last_valid_block_height_buffer
 
-        retry_count = 0
-
         tx_opts = TxOpts(
             skip_preflight=send_options.get("skip_preflight", True),
             preflight_commitment=self.get_commitment(commitment),
             max_retries=send_options.get("max_retries", None)
         )
 
-        response: SendTransactionResp = await self.connection.send_raw_transaction(
-                    serialized_transaction,
-                    tx_opts
-        )
-        signature = response.value
+        signature = await rebroadcaster.send(serialized_transaction, tx_opts)
 
         if skip_confirmation_check:
             return str(signature)
         
-        
-        while retry_count <= confirmation_retries:
-            try:
-                status_response: GetSignatureStatusesResp = await self.connection.get_signature_statuses([signature])
-                if status_response.value[0] is not None:
-                    status = status_response.value[0]
-
-                    if self.commitment_str_to_level(str(status.confirmation_status)) >= self.commitment_to_level(str(commitment)):
-                        return str(signature)
-                    if status.err:
-                        return status.err
-
-                await asyncio.sleep(confirmation_check_interval / 1000)
-
-            except Exception as error:
-                print("Error checking transaction status:", error)
-                if retry_count == confirmation_retries or "Transaction expired" in str(error):
-                    return Exception(str(error))
-
-                retry_count += 1
-
-                await asyncio.sleep(confirmation_retry_timeout / 1000)
-
-                block_height_response: GetBlockHeightResp = await self.connection.get_block_height()
-                if block_height_response.value > last_valid_block_height:
-                    return Exception("Transaction expired")
-
-        return Exception("Transaction failed after maximum retries")
+        resender = rebroadcaster.start(serialized_transaction, last_valid_block_height, resend_interval / 1000)
+        try:
+            err = await confirmation_engine.confirm(
+                signature,
+                last_valid_block_height,
+                self.get_commitment(commitment),
+                check_interval=confirmation_check_interval / 1000,
+                timeout=confirmation_retries * max(confirmation_retry_timeout, confirmation_check_interval) / 1000,
+            )
+        except TransactionExpiredBlockheightExceededError:
+            return Exception("Transaction expired")
+        except asyncio.TimeoutError:
+            return Exception("Transaction failed after maximum retries")
+        except Exception as error:
+            print("Error checking transaction status:", error)
+            return Exception(str(error))
+        finally:
+            resender.cancel()
+
+        if err:
+            return err
+        return str(signature)
     
     @staticmethod
     def commitment_to_level(commitment: str):
@@ -204,4 +209,7 @@ class SolanaTracker:
         
     @staticmethod
     async def wait(seconds: float):
-        await asyncio.sleep(seconds)
\ No newline at end of file
+        await asyncio.sleep(seconds)
+
+
+solana_tracker = SolanaTracker()
@@ -0,0 +1,163 @@
+import asyncio
+import time
+from collections import deque
+
+from solders.keypair import Keypair
+from solders.pubkey import Pubkey
+
+import constant
+from rpcRouter import rpc_router
+from blockhashCache import blockhash_cache
+
+LAMPORTS_PER_SOL = 1000000000
+
+
+class SwapRouter():
+    def __init__(
+        self,
+        tracker,
+        jupiter,
+        budget=constant.swapQuoteBudget,
+        timeout=constant.swapQuoteTimeout,
+        samples=constant.swapLatencySamples,
+    ):
+        """Quote a buy on every swap backend at once and send it through the one paying the most tokens per SOL."""
+        super().__init__()
+        self.tracker = tracker  # swap.solanaSwap.SolanaSwapModule
+        self.jupiter = jupiter  # jupiter.JupiterHelper
+        self.budget = budget
+        self.timeout = timeout
+        self.decimals = {}  # mint -> decimals, needed to compare jupiter's raw amounts
+        self.metrics = {
+            name: {"quotes": 0, "errors": 0, "late": 0, "wins": 0, "latency": deque(maxlen=samples)}
+            for name in ("solanatracker", "jupiter")
+        }
+
+    async def _mint_decimals(self, mint):
+        if mint not in self.decimals:
+            response = await rpc_router.call("get_token_supply", Pubkey.from_string(mint))
+            self.decimals[mint] = response.value.decimals
+        return self.decimals[mint]
+
+    async def _quote_tracker(self, output_mint, amount, slippage_bps, payer):
+        swap_response = await self.tracker.quote(output_mint, amount, slippage_bps, payer)
+        if not swap_response or "txn" not in swap_response:
+            raise Exception(swap_response.get("error", swap_response) if swap_response else "empty response")
+        rate = swap_response.get("rate") or {}
+        return {
+            "backend": "solanatracker",
+            "out_amount": float(rate.get("amountOut", 0)),
+            "fee_sol": float(rate.get("platformFeeUI") or 0),
+            "payload": swap_response,
+        }
+
+    async def _quote_jupiter(self, output_mint, amount, slippage_bps, payer):
+        quote, decimals = await asyncio.gather(
+            self.jupiter.quote(output_mint, int(amount * LAMPORTS_PER_SOL), slippage_bps),
+            self._mint_decimals(output_mint),
+        )
+        platform_fee = quote.get("platformFee") or {}
+        fee = int(platform_fee.get("amount") or 0)
+        return {
+            "backend": "jupiter",
+            # jupiter takes its platform fee out of the output tokens
+            "out_amount": (int(quote["outAmount"]) - fee) / 10 ** decimals,
+            "fee_sol": 0.0,
+            "payload": quote,
+        }
+
+    async def _timed(self, name, coro):
+        metrics = self.metrics[name]
+        metrics["quotes"] += 1
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(coro, self.timeout)
+        except asyncio.CancelledError:
+            # dropped by best_quote, counted as late there
+            raise
+        except Exception:
+            metrics["errors"] += 1
+            metrics["latency"].append(time.perf_counter() - start)
+            raise
+        metrics["latency"].append(time.perf_counter() - start)
+        return result
+
+    @staticmethod
+    def _score(quote, amount):
+        # tokens received per SOL actually spent, so a platform fee charged on top of the input counts against it
+        return quote["out_amount"] / (amount + quote["fee_sol"])
+
+    async def best_quote(self, output_mint: str, amount, slippage_bps: int, payer: str):
+        """Wait up to `budget` seconds for every backend, then take the best quote in hand.
+
+        If none has answered by then, the first successful one wins. Returns None when all fail.
+        """
+        tasks = {
+            asyncio.create_task(self._timed("solanatracker", self._quote_tracker(output_mint, amount, slippage_bps, payer))): "solanatracker",
+            asyncio.create_task(self._timed("jupiter", self._quote_jupiter(output_mint, amount, slippage_bps, payer))): "jupiter",
+        }
+        quotes = []
+        pending = set(tasks)
+        try:
+            done, pending = await asyncio.wait(pending, timeout=self.budget)
+            while True:
+                for task in done:
+                    if task.exception() is None:
+                        quotes.append(task.result())
+                    else:
+                        print(f'Error quoting on {tasks[task]}: {task.exception()}')
+                if quotes or not pending:
+                    break
+                # nothing usable inside the budget, fall back to whichever answers next
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in pending:
+                self.metrics[tasks[task]]["late"] += 1
+                task.cancel()
+
+        if not quotes:
+            return None
+        best = max(quotes, key=lambda quote: self._score(quote, amount))
+        self.metrics[best["backend"]]["wins"] += 1
+        return best
+
+    async def _perform_jupiter(self, quote, sender: Keypair):
+        try:
+            swap = await self.jupiter.swap_transaction(quote, str(sender.pubkey()))
+            signed_txn = self.jupiter.sign_swap(swap["swapTransaction"], sender)
+            last_valid_block_height = swap.get("lastValidBlockHeight") or (await blockhash_cache.get()).last_valid_block_height
+            # same send, rebroadcast and confirmation path as the tracker swaps
+            txid = await self.tracker.solana_tracker.transaction_sender_and_confirmation_waiter(
+                serialized_transaction=signed_txn,
+                blockhash_with_expiry={"last_valid_block_height": last_valid_block_height},
+                options=self.tracker.swap_options,
+            )
+            if isinstance(txid, Exception):
+                raise txid
+            if not isinstance(txid, str):
+                raise Exception(str(txid))
+            print("Transaction URL:", f"https://solscan.io/tx/{txid}")
+            return txid
+        except Exception as e:
+            print("Swap failed:", str(e))
+            return None
+
+    async def execute_swap(self, output_mint: str, amount, slippage_bps: int, sender: Keypair):
+        quote = await self.best_quote(output_mint, amount, slippage_bps, str(sender.pubkey()))
+        if quote is None:
+            print("Swap failed: no backend returned a quote")
+            return None
+        if quote["backend"] == "jupiter":
+            return await self._perform_jupiter(quote["payload"], sender)
+        return await self.tracker.perform(quote["payload"], sender)
+
+    def stats(self):
+        stats = {}
+        for name, metrics in self.metrics.items():
+            samples = sorted(metrics["latency"])
+            entry = {key: metrics[key] for key in ("quotes", "errors", "late", "wins")}
+            if samples:
+                entry["p50_ms"] = round(samples[len(samples) // 2] * 1000, 1)
+                entry["p95_ms"] = round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 1)
+            stats[name] = entry
+        return stats
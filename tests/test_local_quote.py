@@ -0,0 +1,98 @@
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from localQuote import quote_buy, swap_out
+from poolPrices import USDC, WSOL
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+TOLERANCE = 0.001  # relative, covers rounding differences between our math and the aggregator's
+
+
+def load_cases(name):
+    path = os.path.join(FIXTURES, name)
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)["cases"]
+
+
+CASES = load_cases("formula_vectors.json")
+# live Jupiter captures, recorded with `benchmark.py quote --record`; none are checked in yet
+CAPTURES = load_cases("aggregator_quotes.json")
+
+
+def engine(pools):
+    return SimpleNamespace(pools={mint: dict(pool, mint=mint) for mint, pool in pools.items()})
+
+
+def quote_case(case):
+    quote = quote_buy(case["mint"], case["sol_amount"], case["slippage_bps"], engine(case["pools"]))
+    assert quote is not None
+    assert quote["min_received"] <= quote["out_amount"]
+    assert 0 < quote["price_impact"] < 1
+    return quote
+
+
+@pytest.mark.parametrize("case", CASES, ids=[case["name"] for case in CASES])
+def test_matches_formula_vector(case):
+    assert quote_case(case)["out_raw"] == int(case["out_amount"])
+
+
+@pytest.mark.skipif(not CAPTURES, reason="no recorded aggregator quotes yet")
+@pytest.mark.parametrize("case", CAPTURES, ids=[case["name"] for case in CAPTURES])
+def test_matches_recorded_aggregator_quote(case):
+    expected = int(case["out_amount"])
+    assert abs(quote_case(case)["out_raw"] - expected) <= expected * TOLERANCE
+
+
+def test_fixtures_cover_every_pool_kind():
+    kinds = {pool["kind"] for case in CASES for pool in case["pools"].values()}
+    assert {"raydium", "pumpfun"} <= kinds
+    assert any(USDC in (pool["base_mint"], pool["quote_mint"]) and mint != WSOL
+               for case in CASES for mint, pool in case["pools"].items())
+
+
+def raydium_pool(base_reserve, quote_reserve):
+    return {
+        "kind": "raydium",
+        "base_mint": "token",
+        "quote_mint": WSOL,
+        "base_decimals": 6,
+        "quote_decimals": 9,
+        "base_reserve": base_reserve,
+        "quote_reserve": quote_reserve,
+        "fee_bps": 25,
+    }
+
+
+def test_swap_out_empty_reserves():
+    assert swap_out(raydium_pool(0, 10 ** 12), WSOL, 10 ** 9) is None
+    assert swap_out(raydium_pool(10 ** 12, 0), WSOL, 10 ** 9) is None
+
+
+def test_swap_out_zero_amount():
+    assert swap_out(raydium_pool(10 ** 12, 10 ** 12), WSOL, 0) is None
+
+
+def test_swap_out_impact_grows_with_size():
+    pool = raydium_pool(10 ** 12, 10 ** 12)
+    _, small = swap_out(pool, WSOL, 10 ** 8)
+    _, large = swap_out(pool, WSOL, 10 ** 11)
+    assert 0 < small < large < 1
+
+
+def test_usdc_route_without_sol_pool():
+    pool = dict(raydium_pool(10 ** 12, 10 ** 12), quote_mint=USDC, quote_decimals=6)
+    assert quote_buy("token", 1, 100, engine({"token": pool})) is None
+
+
+def test_unknown_mint():
+    assert quote_buy("token", 1, 100, engine({})) is None
+
+
+def test_min_received_applies_slippage():
+    quote = quote_buy("token", 1, 100, engine({"token": raydium_pool(10 ** 12, 10 ** 12)}))
+    assert quote["min_received"] == pytest.approx(quote["out_amount"] * 0.99, rel=1e-6)
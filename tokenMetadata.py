@@ -0,0 +1,98 @@
+import asyncio
+import time
+from pymongo import UpdateOne
+
+import constant
+from httpSession import get_http_client
+
+
+class TokenMetadataStore():
+    def __init__(
+        self,
+        collection,
+        ttl=constant.tokenMarketTTL,
+        batch_size=constant.dexscreenerBatchSize,
+    ):
+        """Token name/symbol persisted in mongo, price/liquidity/fdv kept briefly in memory."""
+        super().__init__()
+        self.collection = collection
+        self.ttl = ttl
+        self.batch_size = batch_size
+        self.names = {}   # mint -> {"name", "symbol"}, never changes once seen
+        self.market = {}  # mint -> (fetched_at, {"price_usd", "liquidity_usd", "fdv"})
+
+    def _is_fresh(self, mint):
+        entry = self.market.get(mint)
+        return entry is not None and time.monotonic() - entry[0] <= self.ttl
+
+    async def _load_names(self, mints):
+        try:
+            cursor = self.collection.find({"mint": {"$in": mints}}, {"_id": 0, "mint": 1, "name": 1, "symbol": 1})
+            async for doc in cursor:
+                self.names[doc["mint"]] = {"name": doc["name"], "symbol": doc["symbol"]}
+        except Exception as e:
+            print(f'Error loading token metadata: {e}')
+
+    async def _save_names(self, mints):
+        ops = [
+            UpdateOne({"mint": mint}, {"$setOnInsert": {"mint": mint, **self.names[mint]}}, upsert=True)
+            for mint in mints
+        ]
+        try:
+            await self.collection.bulk_write(ops, ordered=False)
+        except Exception as e:
+            print(f'Error saving token metadata: {e}')
+
+    async def _fetch_batch(self, mints):
+        response = await get_http_client().get(constant.dexscreenerTokensURL + ",".join(mints))
+        response.raise_for_status()  # Check for HTTP errors
+        return response.json().get('pairs') or []
+
+    async def _refresh_market(self, mints):
+        chunks = [mints[i:i + self.batch_size] for i in range(0, len(mints), self.batch_size)]
+        results = await asyncio.gather(*(self._fetch_batch(chunk) for chunk in chunks), return_exceptions=True)
+
+        wanted = set(mints)
+        seen = set()
+        new_names = []
+        now = time.monotonic()
+        for pairs in results:
+            if isinstance(pairs, Exception):
+                print(f'Error fetching token info: {pairs}')
+                continue
+            for pair in pairs:
+                base = pair.get('baseToken', {})
+                mint = base.get('address')
+                # dexscreener returns every pair of every mint, keep the first one like the single lookup did
+                if mint not in wanted or mint in seen:
+                    continue
+                seen.add(mint)
+                self.market[mint] = (now, {
+                    "price_usd": pair.get('priceUsd', 'N/A'),
+                    "liquidity_usd": pair.get('liquidity', {}).get('usd', 'N/A'),
+                    "fdv": pair.get('fdv', 'N/A'),
+                })
+                if mint not in self.names:
+                    self.names[mint] = {"name": base['name'], "symbol": base['symbol']}
+                    new_names.append(mint)
+        if new_names:
+            await self._save_names(new_names)
+
+    async def get_many(self, mints):
+        mints = list(dict.fromkeys(mints))
+        unknown = [mint for mint in mints if mint not in self.names]
+        if unknown:
+            await self._load_names(unknown)
+
+        stale = [mint for mint in mints if not self._is_fresh(mint)]
+        if stale:
+            await self._refresh_market(stale)
+
+        token_infos = {}
+        for mint in mints:
+            if mint in self.names and mint in self.market:
+                token_infos[mint] = {**self.names[mint], **self.market[mint][1]}
+        return token_infos
+
+    async def get(self, mint):
+        return (await self.get_many([mint])).get(mint)
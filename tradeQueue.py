@@ -0,0 +1,69 @@
+import asyncio
+import time
+
+import constant
+
+
+class TradeQueue():
+    def __init__(
+        self,
+        dedupe_window=constant.tradeDedupeWindow,
+    ):
+        """Runs trades one at a time per wallet and drops repeats of a trade already submitted."""
+        super().__init__()
+        self.dedupe_window = dedupe_window
+        self._wallets = {}  # wallet -> [lock, trades holding or waiting for it]
+        self._inflight = {}  # trade key -> task
+        self._done = {}  # trade key -> monotonic time it finished, oldest first
+
+    def _prune(self):
+        cutoff = time.monotonic() - self.dedupe_window
+        while self._done:
+            key, finished_at = next(iter(self._done.items()))
+            if finished_at > cutoff:
+                break
+            del self._done[key]
+
+    def is_running(self, key):
+        return key in self._inflight
+
+    def is_duplicate(self, key):
+        self._prune()
+        return key in self._inflight or key in self._done
+
+    def submit(self, key, wallet, trade):
+        """Schedule `trade()` (a coroutine function) behind the wallet's earlier trades.
+
+        `key` identifies the request, e.g. (userId, mint, amount, message_id); a key that is
+        still running or finished less than dedupe_window ago is ignored and None is returned.
+        """
+        if self.is_duplicate(key):
+            return None
+        task = asyncio.create_task(self._run(key, wallet, trade))
+        self._inflight[key] = task
+        return task
+
+    async def _run(self, key, wallet, trade):
+        entry = self._wallets.get(wallet)
+        if entry is None:
+            entry = self._wallets[wallet] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                return await trade()
+        except Exception as e:
+            print(f'Error executing trade {key}: {e}')
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._wallets[wallet]
+            del self._inflight[key]
+            self._done[key] = time.monotonic()
+
+    async def stop(self):
+        # never cancel a trade halfway through sending, let the queued ones finish
+        if self._inflight:
+            await asyncio.gather(*self._inflight.values(), return_exceptions=True)
+
+
+trade_queue = TradeQueue()
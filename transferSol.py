@@ -5,6 +5,8 @@ from solders.keypair import Keypair
 from solders.message import MessageV0
 from solders.system_program import TransferParams, transfer
 from solders.transaction import VersionedTransaction
+from blockhashCache import blockhash_cache
+from solanaHelper import SolanaHelper
 
 def transfer_sol(senderPubKey, senderKeypairStr, recieverPubKey):
     sender = Pubkey.from_string(senderPubKey)  # let's pretend this account actually has SOL to send
@@ -15,7 +17,8 @@ def transfer_sol(senderPubKey, senderKeypairStr, recieverPubKey):
         )
     )
 
-    blockhash = Hash.default()  # replace with a real blockhash using get_latest_blockhash
+    cached = blockhash_cache.latest()  # prefetched by the bot's background refresher
+    blockhash = cached.blockhash if cached else SolanaHelper().getLatestBlockHash().value.blockhash
     senderKeypair = Keypair.from_base58_string(senderKeypairStr)
 
     msg = MessageV0.try_compile(
@@ -0,0 +1,131 @@
+import asyncio
+import time
+from solana.rpc.core import TransactionExpiredBlockheightExceededError, _COMMITMENT_TO_SOLDERS
+from solders.rpc.config import RpcSignatureSubscribeConfig
+from solders.rpc.requests import SignatureSubscribe, SignatureUnsubscribe, SlotSubscribe, SlotUnsubscribe
+
+import constant
+from rpcBatcher import rpc_batcher
+from rpcRouter import rpc_router
+from solanaWs import ws_hub
+
+COMMITMENT_LEVELS = {"processed": 0, "confirmed": 1, "finalized": 2}
+
+
+def confirmation_level(status):
+    # TransactionConfirmationStatus.Confirmed -> 1
+    return COMMITMENT_LEVELS.get(str(status.confirmation_status).split(".")[-1].lower(), -1)
+
+
+class ConfirmationEngine():
+    def __init__(self, hub=ws_hub, safety_poll_interval=constant.confirmationSafetyPollInterval):
+        """Confirm transactions from signatureSubscribe notifications, polling only as a fallback."""
+        super().__init__()
+        self.hub = hub
+        self.safety_poll_interval = safety_poll_interval
+        self.slot = None
+        self._anchor = None  # (slot, block_height) from the last real getBlockHeight
+        self._slot_handle = None
+
+    async def start(self):
+        if self._slot_handle is None:
+            self._slot_handle = await self.hub.subscribe(
+                lambda request_id: SlotSubscribe(request_id),
+                lambda subscription, request_id: SlotUnsubscribe(subscription, request_id),
+                self._on_slot,
+            )
+
+    async def stop(self):
+        if self._slot_handle is not None:
+            await self.hub.unsubscribe(self._slot_handle)
+            self._slot_handle = None
+
+    def _on_slot(self, notification):
+        self.slot = notification.result.slot
+
+    def estimated_block_height(self):
+        # block height grows by at most one per slot, so this never underestimates
+        if self._anchor is None or self.slot is None or not self.hub.connected.is_set():
+            return None
+        anchor_slot, anchor_height = self._anchor
+        return anchor_height + max(self.slot - anchor_slot, 0)
+
+    async def _is_expired(self, last_valid_block_height, commitment):
+        estimate = self.estimated_block_height()
+        if estimate is not None and estimate <= last_valid_block_height:
+            return False
+        block_height = (await rpc_router.call("get_block_height", commitment)).value
+        if self.slot is not None:
+            self._anchor = (self.slot, block_height)
+        return block_height > last_valid_block_height
+
+    async def _poll(self, signature, commitment):
+        response = await rpc_batcher.get_signature_statuses([signature])
+        status = response.value[0]
+        if status is None:
+            return None
+        if status.err or confirmation_level(status) >= COMMITMENT_LEVELS[commitment]:
+            return status
+        return None
+
+    async def confirm(self, signature, last_valid_block_height=None, commitment="confirmed", check_interval=1.0, timeout=None):
+        """Wait until `signature` reaches `commitment`.
+
+        Returns the transaction error (None on success). Raises TransactionExpiredBlockheightExceededError
+        once the block height passes `last_valid_block_height`, asyncio.TimeoutError after `timeout` seconds.
+        """
+        loop = asyncio.get_running_loop()
+        notified = loop.create_future()
+
+        def on_signature(notification):
+            if not notified.done():
+                notified.set_result(notification.result.value.err)
+
+        config = RpcSignatureSubscribeConfig(commitment=_COMMITMENT_TO_SOLDERS[commitment])
+        handle = None
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            try:
+                handle = await self.hub.subscribe(
+                    lambda request_id: SignatureSubscribe(signature, config, request_id),
+                    lambda subscription, request_id: SignatureUnsubscribe(subscription, request_id),
+                    on_signature,
+                )
+            except Exception as e:
+                # the websocket is only a shortcut, status polling alone still confirms
+                print(f"Error subscribing to {signature}, polling only: {e}")
+            while True:
+                # poll fast until the server acknowledged the subscription, then only as a safety net
+                subscribed = handle is not None and self.hub.is_active(handle)
+                interval = self.safety_poll_interval if subscribed else check_interval
+                if deadline is not None:
+                    interval = min(interval, max(deadline - time.monotonic(), 0))
+                done, _ = await asyncio.wait([notified], timeout=interval)
+                if done:
+                    return notified.result()
+
+                try:
+                    status = await self._poll(signature, commitment)
+                    if status is not None:
+                        return status.err
+                    if last_valid_block_height is not None and await self._is_expired(last_valid_block_height, commitment):
+                        raise TransactionExpiredBlockheightExceededError(f"{signature} has expired: block height exceeded")
+                except TransactionExpiredBlockheightExceededError:
+                    raise
+                except Exception as e:
+                    print(f"Error checking transaction status: {e}")
+
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise asyncio.TimeoutError(f"{signature} not confirmed after {timeout}s")
+        finally:
+            if handle is None:
+                notified.cancel()
+            elif notified.done() and not notified.cancelled():
+                # signatureSubscribe is one-shot, the server already dropped it
+                self.hub.forget(handle)
+            else:
+                notified.cancel()
+                await self.hub.unsubscribe(handle)
+
+
+confirmation_engine = ConfirmationEngine()
@@ -0,0 +1,77 @@
+import asyncio
+from solana.rpc.types import TxOpts
+
+import constant
+from rpcRouter import rpc_router
+from txConfirmation import confirmation_engine
+
+RESEND_OPTS = TxOpts(skip_preflight=True, max_retries=0)  # we do the retrying ourselves
+
+
+class Rebroadcaster():
+    def __init__(self, router=rpc_router, fan_out=constant.rebroadcastFanOut):
+        """Resend signed transactions until they land or their blockhash expires."""
+        super().__init__()
+        self.router = router
+        self.fan_out = fan_out
+        self._tasks = set()
+
+    async def _fan_out(self, raw_tx, opts, fan_out):
+        # the best node goes through the router (health accounting and failover), the rest best-effort
+        extra = [e.client for e in self.router.healthy()[1:fan_out]]
+        results = await asyncio.gather(
+            self.router.call("send_raw_transaction", raw_tx, opts),
+            *(client.send_raw_transaction(raw_tx, opts) for client in extra),
+            return_exceptions=True,
+        )
+        for result in results:
+            if not isinstance(result, Exception):
+                return result.value
+        raise results[0]
+
+    async def send(self, raw_tx: bytes, opts: TxOpts = RESEND_OPTS, fan_out=None):
+        return await self._fan_out(raw_tx, opts, fan_out or self.fan_out)
+
+    async def _resend_loop(self, raw_tx, last_valid_block_height, interval, fan_out):
+        while True:
+            await asyncio.sleep(interval)
+            estimate = confirmation_engine.estimated_block_height()
+            if last_valid_block_height is not None and estimate is not None and estimate > last_valid_block_height:
+                return
+            try:
+                await self._fan_out(raw_tx, RESEND_OPTS, fan_out)
+            except Exception as e:
+                print(f'Error rebroadcasting transaction: {e}')
+
+    def start(self, raw_tx: bytes, last_valid_block_height=None, interval=constant.rebroadcastInterval, fan_out=None):
+        """Resend `raw_tx` every `interval` seconds in the background, cancel the returned task once confirmed."""
+        task = asyncio.create_task(self._resend_loop(raw_tx, last_valid_block_height, interval, fan_out or self.fan_out))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _track(self, raw_tx, signature, last_valid_block_height, commitment, interval):
+        resender = self.start(raw_tx, last_valid_block_height, interval)
+        try:
+            err = await confirmation_engine.confirm(signature, last_valid_block_height, commitment)
+            if err:
+                print(f'Transaction {signature} failed: {err}')
+        except Exception as e:
+            print(f'Transaction {signature} not confirmed: {e}')
+        finally:
+            resender.cancel()
+
+    def track(self, raw_tx: bytes, signature, last_valid_block_height, commitment="confirmed", interval=constant.rebroadcastInterval):
+        """Fire and forget: keep resending `raw_tx` until it is confirmed or expired."""
+        task = asyncio.create_task(self._track(raw_tx, signature, last_valid_block_height, commitment, interval))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def stop(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+rebroadcaster = Rebroadcaster()
@@ -0,0 +1,60 @@
+import asyncio
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+import constant
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    def __init__(
+        self,
+        max_running=constant.updateConcurrency,
+        max_pending=constant.updateMaxPending,
+    ):
+        """Runs updates of different chats concurrently while each chat's updates run one at a time, in arrival order."""
+        # the base semaphore bounds every accepted update, including those queued behind their chat
+        super().__init__(max_pending)
+        self.max_running = max_running
+        self._running = asyncio.BoundedSemaphore(max_running)
+        self._chats = {}  # chat id -> [lock, updates holding or waiting for it]
+
+    @staticmethod
+    def chat_key(update: object):
+        if not isinstance(update, Update):
+            return None
+        if update.effective_chat is not None:
+            return update.effective_chat.id
+        if update.effective_user is not None:
+            return update.effective_user.id
+        return None
+
+    async def do_process_update(self, update, coroutine):
+        key = self.chat_key(update)
+        if key is None:
+            async with self._running:
+                await coroutine
+            return
+
+        entry = self._chats.get(key)
+        if entry is None:
+            entry = self._chats[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            # updates reach here in the order they were fetched and asyncio locks are fifo,
+            # so chat_data changes like callbackType happen in the order the user made them
+            async with entry[0]:
+                # only take a running slot once it is this update's turn, so a busy chat
+                # waiting on itself does not starve the others
+                async with self._running:
+                    await coroutine
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._chats[key]
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
@@ -0,0 +1,75 @@
+from collections import OrderedDict
+
+import constant
+
+
+class UserCache():
+    def __init__(self, max_size=constant.userCacheSize):
+        """Bounded LRU of UserModel records keyed by userId, in front of the wallet collection."""
+        super().__init__()
+        self.max_size = max_size
+        self.users = OrderedDict()
+        self.generations = {}  # userId -> writes since its first in-flight read, only while one is in flight
+        self.reads = {}  # userId -> mongo reads in flight
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, userId):
+        user = self.users.get(int(userId))
+        if user is None:
+            self.misses += 1
+            return None
+        self.users.move_to_end(int(userId))
+        self.hits += 1
+        return user
+
+    def begin_read(self, userId):
+        """Called before reading mongo: the token for put_if_unchanged, end_read must follow."""
+        userId = int(userId)
+        self.reads[userId] = self.reads.get(userId, 0) + 1
+        return self.generations.setdefault(userId, 0)
+
+    def end_read(self, userId):
+        userId = int(userId)
+        self.reads[userId] -= 1
+        if not self.reads[userId]:
+            del self.reads[userId]
+            del self.generations[userId]
+
+    def _bump(self, userId):
+        # only a read in flight can be overtaken by a write
+        if userId in self.generations:
+            self.generations[userId] += 1
+
+    def put_if_unchanged(self, userId, user, generation):
+        # an update or invalidation that landed while the document was being read is newer than it
+        if self.generations.get(int(userId)) != generation:
+            return False
+        self.put(userId, user)
+        return True
+
+    def put(self, userId, user):
+        self._bump(int(userId))
+        self.users[int(userId)] = user
+        self.users.move_to_end(int(userId))
+        while len(self.users) > self.max_size:
+            self.users.popitem(last=False)
+
+    def invalidate(self, userId):
+        try:
+            self._bump(int(userId))
+            self.users.pop(int(userId), None)
+        except (TypeError, ValueError):
+            pass
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self.users),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+user_cache = UserCache()
@@ -0,0 +1,28 @@
+import constant
+from dbSchema import USER_PROJECTION
+
+
+async def iter_users(collection, model=None, batch_size=constant.userBatchSize, after_id=None, validate=True, projection=USER_PROJECTION):
+    """Stream wallet documents page by page ordered by _id, holding at most one page in memory.
+
+    Yields `model` instances (built with model_construct when validate is False), or the raw
+    documents including _id when no model is given. Pass the last seen _id as after_id to resume.
+    """
+    projection = None if projection is None else {**projection, "_id": 1}
+    while True:
+        query = {} if after_id is None else {"_id": {"$gt": after_id}}
+        page = await collection.find(query, projection).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not page:
+            return
+        for user_dict in page:
+            if model is None:
+                yield user_dict
+                continue
+            fields = {k: v for k, v in user_dict.items() if k != "_id"}
+            try:
+                yield model(**fields) if validate else model.model_construct(**fields)
+            except Exception as e:
+                print(f'Skipping invalid user {user_dict.get("_id")}: {e}')
+        after_id = page[-1]["_id"]
+        if len(page) < batch_size:
+            return
@@ -0,0 +1,83 @@
+import argparse
+import asyncio
+import os
+import sys
+from bson import json_util
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReplaceOne
+from pymongo.errors import BulkWriteError
+
+import constant
+from userStore import iter_users
+
+
+async def export_wallets(collection, out, batch_size):
+    count = 0
+    async for user_dict in iter_users(collection, batch_size=batch_size, projection=None):
+        out.write(json_util.dumps(user_dict) + "\n")
+        count += 1
+    return count
+
+
+async def write_batch(collection, ops, userIds):
+    """Number of rows written; rows the server rejected are reported and skipped."""
+    try:
+        await collection.bulk_write(ops, ordered=False)
+        return len(ops)
+    except BulkWriteError as e:
+        errors = e.details.get('writeErrors', [])
+        for error in errors:
+            print(f'Error importing wallet of user {userIds[error["index"]]}: {error.get("errmsg")}', file=sys.stderr)
+        return len(ops) - len(errors)
+
+
+async def import_wallets(collection, source, batch_size):
+    count = 0
+    ops = []
+    userIds = []
+    for line in source:
+        if not line.strip():
+            continue
+        user_dict = json_util.loads(line)
+        # the target's own _id is kept, replacing it with the exported one fails as an immutable field change
+        user_dict.pop("_id", None)
+        # upsert on userId so re-running an import never duplicates wallets
+        ops.append(ReplaceOne({"userId": user_dict["userId"]}, user_dict, upsert=True))
+        userIds.append(user_dict["userId"])
+        if len(ops) >= batch_size:
+            count += await write_batch(collection, ops, userIds)
+            ops = []
+            userIds = []
+    if ops:
+        count += await write_batch(collection, ops, userIds)
+    return count
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="NDJSON export/import of the wallet collection")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("path", nargs="?", default="-", help="file to write/read, - for stdout/stdin")
+    parser.add_argument("--batch-size", type=int, default=constant.userBatchSize)
+    args = parser.parse_args()
+
+    load_dotenv()
+    mongoClient = AsyncIOMotorClient(os.getenv("dbURI"))
+    wallet_collection = mongoClient.telegram.wallet
+    try:
+        if args.command == "export":
+            out = sys.stdout if args.path == "-" else open(args.path, "w")
+            with out:
+                count = await export_wallets(wallet_collection, out, args.batch_size)
+            print(f'Exported {count} wallets', file=sys.stderr)
+        else:
+            source = sys.stdin if args.path == "-" else open(args.path)
+            with source:
+                count = await import_wallets(wallet_collection, source, args.batch_size)
+            print(f'Imported {count} wallets', file=sys.stderr)
+    finally:
+        mongoClient.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
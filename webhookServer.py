@@ -0,0 +1,85 @@
+import hmac
+import time
+from collections import deque
+
+from aiohttp import web
+from telegram import Update
+from telegram.ext import Application
+
+import constant
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookServer():
+    def __init__(
+        self,
+        app: Application,
+        secret_token: str,
+        listen=constant.webhookListen,
+        port=constant.webhookPort,
+        path=constant.webhookPath,
+        samples=constant.webhookLatencySamples,
+    ):
+        """Local aiohttp endpoint Telegram posts updates to, feeding the application's update queue."""
+        super().__init__()
+        if not secret_token:
+            raise ValueError("a webhook secret token is required")
+        self.app = app
+        self.secret_token = secret_token
+        self.listen = listen
+        self.port = port
+        self.path = path
+        self.received_at = {}  # update_id -> monotonic time the POST arrived
+        self.latencies = deque(maxlen=samples)  # seconds from POST to last handler finished
+        self.rejected = 0
+        self._runner = None
+
+    async def _handle(self, request: web.Request):
+        if not hmac.compare_digest(request.headers.get(SECRET_HEADER, "").encode(), self.secret_token.encode()):
+            self.rejected += 1
+            return web.Response(status=403)
+        try:
+            update = Update.de_json(await request.json(), self.app.bot)
+        except Exception as e:
+            print(f'Error decoding webhook update: {e}')
+            return web.Response(status=400)
+        if update is None:
+            return web.Response(status=400)
+        if len(self.received_at) >= self.latencies.maxlen:
+            # an update that never reached the last group, stop tracking the oldest one
+            self.received_at.pop(next(iter(self.received_at)))
+        self.received_at[update.update_id] = time.monotonic()
+        # answer telegram right away, handlers run from the queue
+        await self.app.update_queue.put(update)
+        return web.Response()
+
+    async def handled(self, update: object, context=None):
+        """Registered as the last handler group, records the end-to-end latency of an update."""
+        if not isinstance(update, Update):
+            return
+        received = self.received_at.pop(update.update_id, None)
+        if received is not None:
+            self.latencies.append(time.monotonic() - received)
+
+    def stats(self):
+        samples = sorted(self.latencies)
+        if not samples:
+            return {"updates": 0, "rejected": self.rejected}
+
+        def pct(p):
+            return round(samples[min(len(samples) - 1, int(len(samples) * p))] * 1000, 2)
+
+        return {"updates": len(samples), "rejected": self.rejected, "p50_ms": pct(0.5), "p95_ms": pct(0.95), "p99_ms": pct(0.99)}
+
+    async def start(self):
+        server = web.Application()
+        server.router.add_post(self.path, self._handle)
+        self._runner = web.AppRunner(server, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.listen, self.port).start()
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,161 @@
+import asyncio
+import os
+from bson import ObjectId, json_util
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+import constant
+
+
+class WriteBehindQueue():
+    def __init__(
+        self,
+        db,
+        max_batch=constant.writeBatchSize,
+        flush_interval=constant.writeFlushInterval,
+        spool_path=constant.writeSpoolPath,
+    ):
+        """Coalesce non-critical writes from handlers into periodic bulk_write batches."""
+        super().__init__()
+        self.db = db
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.spool_path = spool_path
+        self._sets = {}  # (collection, filter json) -> {"collection", "kind", "filter", "fields", "upsert"}
+        self._inserts = []  # {"collection", "kind", "doc"}
+        self._inflight = []
+        self._flusher = None
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def _key(collection, filter):
+        return collection, json_util.dumps(filter, sort_keys=True)
+
+    def __len__(self):
+        return len(self._sets) + len(self._inserts)
+
+    def set_fields(self, collection, filter, fields, upsert=False):
+        # later $set's on the same document are merged, only the final values are written
+        key = self._key(collection, filter)
+        entry = self._sets.get(key)
+        if entry is None:
+            self._sets[key] = {"collection": collection, "kind": "set", "filter": filter, "fields": dict(fields), "upsert": upsert}
+        else:
+            entry["fields"].update(fields)
+            entry["upsert"] = entry["upsert"] or upsert
+        self._maybe_flush()
+
+    def insert(self, collection, doc):
+        # a client-side _id makes a replayed insert a duplicate-key error instead of a second record
+        doc.setdefault("_id", ObjectId())
+        self._inserts.append({"collection": collection, "kind": "insert", "doc": doc})
+        self._maybe_flush()
+
+    def pending_fields(self, collection, filter):
+        """$set values queued or being written for this document, so readers see their own writes."""
+        key = self._key(collection, filter)
+        fields = {}
+        for entry in self._inflight:
+            if entry["kind"] == "set" and self._key(entry["collection"], entry["filter"]) == key:
+                fields.update(entry["fields"])
+        if key in self._sets:
+            fields.update(self._sets[key]["fields"])
+        return fields
+
+    def _maybe_flush(self):
+        if len(self) >= self.max_batch and not self._lock.locked():
+            asyncio.create_task(self.flush())
+
+    @staticmethod
+    def _to_op(entry):
+        if entry["kind"] == "set":
+            return UpdateOne(entry["filter"], {"$set": entry["fields"]}, upsert=entry["upsert"])
+        return InsertOne(entry["doc"])
+
+    async def flush(self):
+        async with self._lock:
+            if not len(self):
+                return
+            self._inflight = list(self._sets.values()) + self._inserts
+            self._sets, self._inserts = {}, []
+            by_collection = {}
+            for entry in self._inflight:
+                by_collection.setdefault(entry["collection"], []).append(entry)
+
+            failed = []
+            for collection, entries in by_collection.items():
+                try:
+                    await self.db[collection].bulk_write([self._to_op(e) for e in entries], ordered=False)
+                except BulkWriteError as e:
+                    # per-document errors (duplicate keys, validation) will not succeed on retry either
+                    print(f'Dropping {len(e.details.get("writeErrors", []))} rejected writes to {collection}: {e.details.get("writeErrors", [])[:1]}')
+                except Exception as e:
+                    # connection loss, timeouts, server selection: nothing is known to be written, try again later
+                    print(f'Error writing {len(entries)} queued writes to {collection}, will retry: {e}')
+                    failed += entries
+            self._inflight = []
+            for entry in failed:
+                self._requeue(entry)
+            if failed or os.path.exists(self.spool_path):
+                self._sync_spool()
+
+    def _requeue(self, entry):
+        if entry["kind"] == "set":
+            key = self._key(entry["collection"], entry["filter"])
+            newer = self._sets.get(key)
+            # values queued while the batch was in flight win over the failed ones
+            entry = {**entry, "fields": {**entry["fields"], **(newer["fields"] if newer else {})}}
+            self._sets[key] = entry
+        else:
+            self._inserts.append(entry)
+
+    def _spool(self):
+        # durable snapshot of everything still unwritten, replayed by load_spool on the next start
+        tmp_path = self.spool_path + ".tmp"
+        try:
+            with open(tmp_path, "w") as spool:
+                for entry in list(self._sets.values()) + self._inserts:
+                    spool.write(json_util.dumps(entry) + "\n")
+            os.replace(tmp_path, self.spool_path)
+        except OSError as e:
+            print(f'Error spooling writes: {e}')
+
+    def load_spool(self):
+        if not os.path.exists(self.spool_path):
+            return
+        with open(self.spool_path) as spool:
+            for line in spool:
+                if line.strip():
+                    self._requeue(json_util.loads(line))
+
+    def _sync_spool(self):
+        # the spool mirrors what is still unwritten, so a restart never replays a write that already landed
+        if len(self):
+            self._spool()
+        elif os.path.exists(self.spool_path):
+            os.remove(self.spool_path)
+
+    async def _run_flusher(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f'Error flushing writes: {e}')
+
+    def start(self):
+        self.load_spool()
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._run_flusher())
+
+    async def stop(self):
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()